@@ -0,0 +1,32 @@
+import pytest
+from core.testing import QueryBudget, load_budgets, save_budgets
+
+OBSERVED = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-query-budgets',
+        action='store_true',
+        help='Поднять бюджеты в файле до наблюдаемого числа запросов.'
+    )
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request):
+    """Каждый тест проверяет бюджеты запросов всех представлений."""
+    update = request.config.getoption('--update-query-budgets')
+    budget = QueryBudget(load_budgets(), check=not update)
+    with budget:
+        yield budget
+    for view, count in budget.observed.items():
+        OBSERVED[view] = max(count, OBSERVED.get(view, 0))
+
+
+def pytest_sessionfinish(session):
+    if session.config.getoption('--update-query-budgets') and OBSERVED:
+        budgets = load_budgets()
+        for view, count in OBSERVED.items():
+            if view.startswith(('posts:', 'api:')):
+                budgets[view] = max(count, budgets.get(view, 0))
+        save_budgets(budgets)
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def immediate_tasks(settings):
+    """Фоновые задачи выполняются сразу, до конца теста."""
+    settings.TASKS = {'BACKEND': 'core.tasks.backends.ImmediateBackend'}
@@ -0,0 +1,157 @@
+"""Сериализация для API без создания объектов моделей.
+
+Поля ресурса описаны словарём «имя в API → путь в ORM». Выборка идёт
+через ``values()`` только по запрошенным полям (``?fields=``), строки
+сразу кодируются в JSON. Страница ленты отдаётся кусками по мере
+чтения курсора базы, поэтому большая страница не собирается в памяти.
+"""
+import json
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+
+from posts.paginators import (
+    NEXT, PREVIOUS, encode_cursor, position_of, seek
+)
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+# Поля, без которых не построить курсор ленты.
+CURSOR_LOOKUPS = ('pub_date', 'id')
+# Столько строк уходит клиенту одним куском потокового ответа.
+CHUNK_ROWS = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def parse_fields(request, available):
+    """Имена полей из ``?fields=a,b``; по умолчанию все поля ресурса."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = list(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise ApiError(400, 'Неизвестные поля: {}. Доступны: {}.'.format(
+            ', '.join(unknown) or '—', ', '.join(available)))
+    return fields
+
+
+def values(queryset, fields, available, extra=()):
+    """``values()`` ровно по нужным полям и служебным путям ``extra``."""
+    lookups = [available[name] for name in fields]
+    return queryset.values(*dict.fromkeys([*lookups, *extra]))
+
+
+def _lookup(row, path):
+    if isinstance(row, dict):
+        return row[path]
+    for attribute in path.split('__'):
+        if row is None:
+            return None
+        row = getattr(row, attribute)
+    return row
+
+
+def _convert(name, value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if name == 'image':
+        return default_storage.url(str(value)) if value else None
+    return value
+
+
+def present(row, fields, available):
+    """Словарь для JSON из строки ``values()`` или объекта модели."""
+    return {
+        name: _convert(name, _lookup(row, available[name]))
+        for name in fields
+    }
+
+
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def feed_chunks(queryset, position, limit, fields, available, link):
+    """Куски JSON страницы ленты с курсорами ``next`` и ``previous``.
+
+    Вперёд строки читаются итератором и кодируются по одной; назад —
+    выбираются целиком, чтобы развернуть их в порядок ленты.
+    ``link(token)`` строит адрес соседней страницы.
+    """
+    rows = seek(
+        values(queryset, fields, available, CURSOR_LOOKUPS), position
+    )[:limit + 1]
+    direction = position[0] if position else None
+    if direction == PREVIOUS:
+        rows = list(rows)
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    else:
+        rows = rows.iterator()
+        has_more = False
+    chunk = ['{"results": [']
+    first = last = None
+    count = 0
+    for row in rows:
+        if count == limit:
+            has_more = True
+            break
+        chunk.append(
+            (',' if count else '') + dumps(present(row, fields, available)))
+        last = position_of(row)
+        first = first or last
+        count += 1
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk)
+    has_next = True if direction == PREVIOUS else has_more
+    has_previous = direction is not None and (
+        has_more if direction == PREVIOUS else True)
+    yield '], "next": {}, "previous": {}}}'.format(
+        dumps(link(encode_cursor(NEXT, last))
+              if has_next and last else None),
+        dumps(link(encode_cursor(PREVIOUS, first))
+              if has_previous and first else None),
+    )
+
+
+def page_document(page, fields, available, link):
+    """Готовая страница ``CursorPaginator`` в виде словаря для JSON."""
+    return {
+        'results': [
+            present(obj, fields, available) for obj in page.object_list],
+        'next': link(page.next_cursor) if page.next_cursor else None,
+        'previous': (
+            link(page.previous_cursor) if page.previous_cursor else None),
+    }
@@ -0,0 +1,13 @@
+from django import forms
+
+from posts.forms import PostForm
+from posts.models import Group
+
+
+class ApiPostForm(PostForm):
+    """PostForm, где группа задаётся slug, как она и отдаётся в API."""
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+    )
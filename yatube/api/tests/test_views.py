@@ -0,0 +1,217 @@
+import json
+
+from django.core.cache import cache
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudget
+from posts.models import Comment, Follow, Group, Post, User
+
+POSTS_URL = reverse('api:posts')
+FOLLOW_URL = reverse('api:follow_index')
+
+
+@override_settings(TASKS={'BACKEND': 'core.tasks.backends.ImmediateBackend'})
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Запись {number}')
+            for number in range(25)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content)
+                          if response.streaming else response.content)
+
+    def send_json(self, method, url, data):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json')
+
+    def test_cursor_pages_cover_feed(self):
+        seen = []
+        url = POSTS_URL
+        pages = 0
+        while url:
+            page = self.get_json(url)
+            seen.extend(row['id'] for row in page['results'])
+            url = page['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(
+            seen, [post.pk for post in reversed(self.posts)])
+        previous = self.get_json(POSTS_URL, cursor=self.get_json(
+            POSTS_URL)['next'].split('cursor=')[1])['previous']
+        self.assertEqual(
+            [row['id'] for row in self.get_json(previous)['results']],
+            seen[:10])
+
+    def test_sparse_fields(self):
+        page = self.get_json(POSTS_URL, fields='id,author')
+        self.assertEqual(
+            page['results'][0], {'id': self.post.pk, 'author': 'author'})
+        response = self.client.get(POSTS_URL, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_large_page_is_streamed(self):
+        response = self.client.get(POSTS_URL, {'limit': 200})
+        self.assertTrue(response.streaming)
+        page = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(page['results']), len(self.posts))
+        self.assertIsNone(page['next'])
+
+    def test_feed_not_modified_without_queries(self):
+        self.client.logout()
+        etag = self.client.get(POSTS_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(POSTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новая запись')
+        response = self.client.get(POSTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_etag(self):
+        url = reverse('api:comments', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_read_endpoints(self):
+        group = self.get_json(reverse('api:group', args=['group']))
+        self.assertEqual(group['title'], 'Группа')
+        self.assertEqual(
+            len(self.get_json(reverse('api:groups'))['results']), 1)
+        self.assertEqual(len(self.get_json(
+            reverse('api:group_list', args=['group']))['results']), 10)
+        profile = self.get_json(reverse('api:profile', args=['author']))
+        self.assertEqual(profile['posts_count'], len(self.posts))
+        detail = self.get_json(
+            reverse('api:post_detail', args=[self.post.pk]))
+        self.assertEqual(detail['group'], 'group')
+        self.assertEqual(detail['comment_count'], 1)
+        comments = self.get_json(reverse('api:comments', args=[self.post.pk]))
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        for url in (
+            reverse('api:post_detail', args=[0]),
+            reverse('api:group_list', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_create_and_edit_post(self):
+        response = self.send_json(
+            'post', POSTS_URL, {'text': 'Из API', 'group': 'group'})
+        self.assertEqual(response.status_code, 201)
+        created = json.loads(response.content)
+        self.assertEqual(created['group'], 'group')
+        post = Post.objects.get(pk=created['id'])
+        self.assertEqual(post.author, self.author)
+        url = reverse('api:post_detail', args=[post.pk])
+        response = self.send_json('patch', url, {'text': 'Исправлено'})
+        self.assertEqual(response.status_code, 200)
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправлено')
+        self.assertEqual(post.group, self.group)
+        response = self.send_json('patch', url, {'text': ''})
+        self.assertIn('text', json.loads(response.content)['errors'])
+
+    def test_write_permissions(self):
+        self.client.logout()
+        self.assertEqual(
+            self.send_json('post', POSTS_URL, {'text': 'x'}).status_code, 401)
+        self.client.force_login(self.reader)
+        url = reverse('api:post_detail', args=[self.post.pk])
+        self.assertEqual(
+            self.send_json('patch', url, {'text': 'x'}).status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 405)
+
+    def test_csrf_failure_is_json(self):
+        """Без CSRF-токена запись отвечает JSON 401/403, а не HTML"""
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(POSTS_URL, {'text': 'x'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        client.force_login(self.author)
+        response = client.post(POSTS_URL, {'text': 'x'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertFalse(Post.objects.filter(text='x').exists())
+        token = 'a' * 64
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        response = client.post(
+            POSTS_URL, {'text': 'x'}, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 201)
+
+    def test_comment_and_follow(self):
+        self.client.force_login(self.reader)
+        response = self.send_json(
+            'post', reverse('api:comments', args=[self.post.pk]),
+            {'text': 'Ещё'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.post.comments.count(), 2)
+        follow_url = reverse('api:follow', args=['author'])
+        self.assertEqual(self.client.post(follow_url).status_code, 201)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(
+            len(self.get_json(FOLLOW_URL)['results']), 10)
+        self.assertEqual(self.client.delete(follow_url).status_code, 204)
+        self.assertEqual(self.client.delete(follow_url).status_code, 404)
+        self.assertEqual(self.get_json(FOLLOW_URL)['results'], [])
+
+    @override_settings(FOLLOW_TIMELINE=True)
+    def test_follow_feed_from_timeline(self):
+        self.client.force_login(self.reader)
+        self.client.post(reverse('api:follow', args=['author']))
+        page = self.get_json(FOLLOW_URL, fields='id')
+        self.assertEqual(
+            page['results'][0], {'id': self.post.pk})
+        self.assertIsNotNone(page['next'])
+
+    def test_search(self):
+        page = self.get_json(reverse('api:search'), q='запись', limit=20)
+        self.assertEqual(page['count'], len(self.posts))
+        self.assertEqual(len(page['results']), 20)
+        self.assertIsNotNone(page['next'])
+
+    def test_views_within_budget(self):
+        with QueryBudget():
+            for name, args in (
+                ('posts', []),
+                ('post_detail', [self.post.pk]),
+                ('comments', [self.post.pk]),
+                ('groups', []),
+                ('group', ['group']),
+                ('group_list', ['group']),
+                ('profile', ['author']),
+                ('profile_posts', ['author']),
+                ('follow_index', []),
+                ('search', []),
+            ):
+                self.client.get(reverse(f'api:{name}', args=args))
+            self.send_json(
+                'post', POSTS_URL, {'text': 'Запись', 'group': 'group'})
+            self.send_json(
+                'patch', reverse('api:post_detail', args=[self.post.pk]),
+                {'text': 'Правка'})
+            self.send_json(
+                'post', reverse('api:comments', args=[self.post.pk]),
+                {'text': 'Комментарий'})
+            self.client.post(reverse('api:follow', args=['reader']))
+            self.client.delete(reverse('api:follow', args=['reader']))
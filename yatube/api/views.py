@@ -0,0 +1,356 @@
+"""JSON API для мобильных клиентов.
+
+Маршруты повторяют ``posts.urls``. Вход общий с сайтом — по сессии,
+поэтому изменяющие запросы проходят проверку CSRF: токен из cookie
+``csrftoken`` передаётся в заголовке ``X-CSRFToken``. Ленты отдают
+ETag из поколения своей области кэша, остальные ответы — ETag
+по содержимому; совпавший If-None-Match получает пустой 304.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, QueryDict, StreamingHttpResponse
+)
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+
+from posts import timelines
+from posts.caching import feed_etag
+from posts.forms import CommentForm
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.paginators import decode_cursor
+from posts.search import SearchResults
+from .encoding import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, ApiError, dumps,
+    feed_chunks, page_document, parse_fields, present, values
+)
+from .forms import ApiPostForm
+
+MAX_LIMIT = 1000
+# Страницы длиннее этого отдаются StreamingHttpResponse.
+STREAM_ABOVE = 100
+SAFE_METHODS = ('GET', 'HEAD')
+JSON = 'application/json'
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), content_type=JSON, status=status)
+
+
+def error(status, detail):
+    return json_response({'detail': detail}, status)
+
+
+def form_errors(form):
+    return json_response({'errors': form.errors.get_json_data()}, 400)
+
+
+def api_view(*methods):
+    """Проверяет метод, вход и CSRF для записи, ошибки отдаёт в JSON.
+
+    Middleware CSRF такие view пропускает: её отказ — HTML-страница,
+    а клиенту API нужен JSON 403.
+    """
+    allowed = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = error(
+                    405, f'Метод {request.method} не поддерживается.')
+                response['Allow'] = ', '.join(sorted(allowed))
+                return response
+            if (request.method not in SAFE_METHODS
+                    and not request.user.is_authenticated):
+                return error(401, 'Нужно войти.')
+            if (request.method not in SAFE_METHODS
+                    and CsrfViewMiddleware().process_view(
+                        request, None, args, kwargs) is not None):
+                return error(403, 'Нет или неверен CSRF-токен.')
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error(404, 'Не найдено.')
+            except ApiError as exc:
+                return error(exc.status, exc.detail)
+        return csrf_exempt(wrapper)
+    return decorator
+
+
+def conditional(request, response):
+    """ETag по содержимому: та же версия у клиента — пустой 304."""
+    if request.method not in SAFE_METHODS or response.status_code != 200:
+        return response
+    set_response_etag(response)
+    return get_conditional_response(
+        request, etag=response['ETag'], response=response)
+
+
+def request_data(request):
+    """Поля формы из JSON или из обычного тела запроса."""
+    if request.content_type == JSON:
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Тело запроса — не JSON.')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Ожидается JSON-объект.')
+        return data
+    if request.method == 'POST':
+        return request.POST.dict()
+    return QueryDict(request.body, encoding=request.encoding).dict()
+
+
+def page_limit(request):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return settings.PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(400, f'limit — целое число от 1 до {MAX_LIMIT}.')
+    return limit
+
+
+def cursor_position(request):
+    token = request.GET.get('cursor')
+    if not token:
+        return None
+    position = decode_cursor(token)
+    if position is None:
+        raise ApiError(400, 'Неверный курсор.')
+    return position
+
+
+def link_builder(request, param='cursor'):
+    def link(value):
+        query = request.GET.copy()
+        query[param] = str(value)
+        return request.build_absolute_uri(
+            f'{request.path}?{query.urlencode()}')
+    return link
+
+
+def feed_response(request, queryset):
+    """Страница ленты; длинные страницы уходят потоком."""
+    fields = parse_fields(request, POST_FIELDS)
+    limit = page_limit(request)
+    chunks = feed_chunks(
+        queryset, cursor_position(request), limit, fields, POST_FIELDS,
+        link_builder(request))
+    if limit > STREAM_ABOVE:
+        return StreamingHttpResponse(chunks, content_type=JSON)
+    return HttpResponse(''.join(chunks), content_type=JSON)
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    if request.method == 'POST':
+        return post_create(request)
+    return index(request)
+
+
+@condition(etag_func=feed_etag('index'))
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+def post_create(request):
+    form = ApiPostForm(request_data(request), files=request.FILES or None)
+    if not form.is_valid():
+        return form_errors(form)
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+    response = json_response(
+        present(post, parse_fields(request, POST_FIELDS), POST_FIELDS), 201)
+    response['Location'] = reverse('api:post_detail', args=[post.pk])
+    return response
+
+
+@api_view('GET', 'PATCH', 'PUT')
+def post_detail(request, post_id):
+    if request.method not in SAFE_METHODS:
+        return post_edit(request, post_id)
+    fields = parse_fields(request, POST_FIELDS)
+    row = values(Post.objects.filter(pk=post_id), fields, POST_FIELDS).first()
+    if row is None:
+        raise Http404
+    return conditional(
+        request, json_response(present(row, fields, POST_FIELDS)))
+
+
+def post_edit(request, post_id):
+    post = get_object_or_404(Post.objects.select_related('group'), pk=post_id)
+    if request.user.pk != post.author_id:
+        raise ApiError(403, 'Изменять пост может только его автор.')
+    data = request_data(request)
+    if request.method == 'PATCH':
+        data = {
+            'text': post.text,
+            'group': post.group.slug if post.group_id else None,
+            **data,
+        }
+    form = ApiPostForm(data, files=request.FILES or None, instance=post)
+    if not form.is_valid():
+        return form_errors(form)
+    post = form.save()
+    return json_response(
+        present(post, parse_fields(request, POST_FIELDS), POST_FIELDS))
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    if request.method == 'POST':
+        return add_comment(request, post_id)
+    fields = parse_fields(request, COMMENT_FIELDS)
+    get_object_or_404(Post.objects.only('id'), pk=post_id)
+    rows = values(
+        Comment.objects.filter(post_id=post_id).order_by('created', 'id'),
+        fields, COMMENT_FIELDS)
+    return conditional(request, json_response({
+        'results': [present(row, fields, COMMENT_FIELDS) for row in rows],
+    }))
+
+
+def add_comment(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    form = CommentForm(request_data(request))
+    if not form.is_valid():
+        return form_errors(form)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return json_response(present(
+        comment, parse_fields(request, COMMENT_FIELDS), COMMENT_FIELDS), 201)
+
+
+@api_view('GET')
+def groups(request):
+    fields = parse_fields(request, GROUP_FIELDS)
+    rows = values(Group.objects.order_by('title', 'id'), fields, GROUP_FIELDS)
+    return conditional(request, json_response({
+        'results': [present(row, fields, GROUP_FIELDS) for row in rows],
+    }))
+
+
+@api_view('GET')
+@condition(etag_func=feed_etag('group', 'slug'))
+def group(request, slug):
+    fields = parse_fields(request, GROUP_FIELDS)
+    row = values(Group.objects.filter(slug=slug), fields, GROUP_FIELDS).first()
+    if row is None:
+        raise Http404
+    return json_response(present(row, fields, GROUP_FIELDS))
+
+
+@api_view('GET')
+@condition(etag_func=feed_etag('group', 'slug'))
+def group_list(request, slug):
+    if not Group.objects.filter(slug=slug).exists():
+        raise Http404
+    return feed_response(request, Post.objects.filter(group__slug=slug))
+
+
+@api_view('GET')
+@condition(etag_func=feed_etag('profile', 'username'))
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = UserStats.for_user(author)
+    user = request.user
+    return json_response({
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': (
+            user.is_authenticated
+            and user.pk != author.pk
+            and Follow.objects.filter(user=user, author=author).exists()),
+    })
+
+
+@api_view('GET')
+@condition(etag_func=feed_etag('profile', 'username'))
+def profile_posts(request, username):
+    if not User.objects.filter(username=username).exists():
+        raise Http404
+    return feed_response(
+        request, Post.objects.filter(author__username=username))
+
+
+@api_view('POST', 'DELETE')
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    user = request.user
+    if request.method == 'DELETE':
+        deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+        if not deleted:
+            raise Http404
+        return HttpResponse(status=204)
+    if user == author:
+        raise ApiError(400, 'Нельзя подписаться на самого себя.')
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    return json_response(
+        {'author': author.username, 'following': True},
+        201 if created else 200)
+
+
+@api_view('GET')
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужно войти.')
+    if not timelines.enabled():
+        return feed_response(request, Post.objects.filter(
+            author__following__user=request.user))
+    fields = parse_fields(request, POST_FIELDS)
+    cursor_position(request)
+    page = timelines.posts_page(
+        timelines.paginator(request.user, page_limit(request)).get_page(
+            request.GET.get('cursor')))
+    return conditional(request, json_response(
+        page_document(page, fields, POST_FIELDS, link_builder(request))))
+
+
+@api_view('GET')
+@condition(etag_func=feed_etag('search'))
+def search(request):
+    fields = parse_fields(request, POST_FIELDS)
+    limit = page_limit(request)
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ApiError(400, 'page — целое число от 1.')
+    results = SearchResults(request.GET.get('q', '').strip())
+    start = (number - 1) * limit
+    ids = results.ids(start, start + limit)
+    rows = {
+        row['id']: row
+        for row in values(
+            Post.objects.filter(pk__in=ids), fields, POST_FIELDS, ('id',))
+    }
+    count = results.count()
+    link = link_builder(request, 'page')
+    return json_response({
+        'count': count,
+        'results': [
+            present(rows[pk], fields, POST_FIELDS)
+            for pk in ids if pk in rows],
+        'next': link(number + 1) if start + limit < count else None,
+        'previous': link(number - 1) if number > 1 else None,
+    })
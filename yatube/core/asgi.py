@@ -0,0 +1,142 @@
+"""ASGI поверх WSGI-приложения Django 2.2.
+
+Django до 3.0 не умеет ASGI, поэтому каждый запрос выполняется
+в пуле потоков, а цикл событий держит соединения: медленные клиенты
+и keep-alive не занимают поток. Тело ответа отправляется по мере
+отдачи, поток ждёт клиента и не копит ответ в памяти.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Тело запроса больше этого размера уходит из памяти во временный файл.
+MAX_MEMORY_BODY = 1024 * 1024
+
+
+class WSGIToASGI:
+    def __init__(self, wsgi_application, workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Неподдерживаемый тип ASGI: {scope['type']}")
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor, self.run_wsgi,
+                self.environ(scope, body), send, loop)
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        """Тело запроса в файле; None, если клиент отключился."""
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # WSGI хранит байты пути как строку latin-1.
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            if key in environ:
+                separator = '; ' if name == 'COOKIE' else ','
+                value = environ[key] + separator + value
+            environ[key] = value
+        return environ
+
+    def run_wsgi(self, environ, send, loop):
+        """Выполняется в потоке пула: WSGI-вызов и отправка ответа."""
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response_start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start.update(
+                status=int(status.split(' ', 1)[0]),
+                headers=[
+                    (name.lower().encode('latin-1'),
+                     value.encode('latin-1'))
+                    for name, value in headers
+                ])
+
+        def send_start():
+            if not response_start.get('sent'):
+                send_sync({
+                    'type': 'http.response.start',
+                    'status': response_start['status'],
+                    'headers': response_start['headers'],
+                })
+                response_start['sent'] = True
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in response:
+                if chunk:
+                    send_start()
+                    send_sync({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_start()
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            # close() шлёт request_finished: соединения с базой
+            # закрываются в том же потоке, где открывались.
+            if hasattr(response, 'close'):
+                response.close()
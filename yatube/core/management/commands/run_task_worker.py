@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.tasks import get_backend
+from core.tasks.backends import SQLiteBackend
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди SQLiteBackend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Разобрать очередь и завершиться.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1,
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Показать размер очереди и выйти.'
+        )
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Вернуть мёртвые задачи в очередь и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not isinstance(backend, SQLiteBackend):
+            raise CommandError('В settings.TASKS нужен SQLiteBackend.')
+        if options['stats']:
+            for status, total in sorted(backend.stats().items()):
+                self.stdout.write(f'{status}: {total}')
+            return
+        if options['requeue_dead']:
+            self.stdout.write(f'Возвращено: {backend.requeue_dead()}.')
+            return
+        try:
+            self.work(backend, options['burst'], options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.report(backend)
+
+    def work(self, backend, burst, poll_interval):
+        while True:
+            close_old_connections()
+            if backend.run_next():
+                continue
+            if burst:
+                return
+            time.sleep(poll_interval)
+
+    def report(self, backend):
+        for name, data in sorted(backend.metrics.snapshot().items()):
+            self.stdout.write(
+                f"{name}: ok {data['succeeded']}, "
+                f"ошибок {data['failed']}, повторов {data['retried']}, "
+                f"мёртвых {data['dead']}, "
+                f"среднее {data['avg_time'] * 1000:.1f} мс, "
+                f"максимум {data['max_time'] * 1000:.1f} мс")
@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import staticfiles
+
+from .routers import Routing, current
+from .timing import RequestTiming, recording_sql, request_timed, stats
+from .timing import current as current_timing
+
+PRIMARY_COOKIE = 'db_primary'
+
+
+class ReplicaMiddleware:
+    """Отправляет чтение запроса в реплику, если пользователь не писал.
+
+    Реплику читают только GET и HEAD: POST и прочие пишут и должны
+    видеть то, что меняют. Запрос с записью ставит куку
+    на ``PRIMARY_STICKY_SECONDS``; пока она жива, чтения этого браузера
+    идут в основную базу, и автор сразу видит свой пост, даже если
+    реплика отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = Routing(replica=(
+            request.method in ('GET', 'HEAD')
+            and PRIMARY_COOKIE not in request.COOKIES))
+        token = current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        if routing.wrote:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1',
+                max_age=settings.PRIMARY_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+
+class TimingMiddleware:
+    """Замеряет запрос и копит статистику по имени представления.
+
+    Заголовок ``Server-Timing`` получают staff и все при ``DEBUG``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            with recording_sql():
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        stats.record(view_name, total, timing)
+        request_timed.send(
+            sender=self.__class__, view_name=view_name,
+            timing=timing, total=total)
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = timing.header(total)
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт ``STATIC_ROOT`` при ``SERVE_STATIC`` без CDN и nginx.
+
+    Стоит первым: до статики не доходят сессии, реплики и замеры.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVE_STATIC:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(settings.STATIC_URL)):
+            response = staticfiles.serve(
+                request, request.path_info[len(settings.STATIC_URL):])
+            if response is not None:
+                return response
+        return self.get_response(request)
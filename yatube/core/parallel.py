@@ -0,0 +1,49 @@
+"""Одновременное чтение независимых данных одной страницы.
+
+При ``settings.PARALLEL_QUERIES`` больше 1 ``gather`` раздаёт
+функции пулу потоков с отдельными соединениями к базе: на сетевой
+базе страница ждёт самый долгий запрос, а не их сумму. Внутри
+транзакции другие соединения не видят её изменений, поэтому там
+функции выполняются по очереди.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from .timing import recording_sql
+
+
+@lru_cache(maxsize=None)
+def _executor(workers):
+    return ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='queries')
+
+
+def _in_transaction():
+    return any(connections[alias].in_atomic_block for alias in connections)
+
+
+def _run(call):
+    close_old_connections()
+    try:
+        with recording_sql():
+            return call()
+    finally:
+        close_old_connections()
+
+
+def gather(*calls):
+    """Результаты функций без аргументов в порядке их передачи."""
+    workers = getattr(settings, 'PARALLEL_QUERIES', 0)
+    if workers < 2 or len(calls) < 2 or _in_transaction():
+        return [call() for call in calls]
+    # Потоки пула видят маршрут к реплике и замеры текущего запроса.
+    futures = [
+        _executor(workers).submit(copy_context().run, _run, call)
+        for call in calls[1:]
+    ]
+    first = calls[0]()
+    return [first] + [future.result() for future in futures]
@@ -0,0 +1,62 @@
+"""Чтение из реплик, запись в основную базу.
+
+``ReplicaMiddleware`` разрешает GET-запросу читать из случайной
+реплики из ``settings.DATABASE_REPLICAS``. Запись всегда идёт
+в основную базу, и после неё чтения того же запроса тоже. Вне запроса
+(команды, фоновые задачи) всё идёт в основную базу.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Сессии и пользователи нужны сразу после входа, отставание реплики
+# разлогинило бы только что вошедшего.
+PRIMARY_APPS = {'auth', 'sessions'}
+
+
+class Routing:
+    """Маршрут текущего запроса."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+current = ContextVar('routing', default=None)
+
+
+def use_primary():
+    """Оставшиеся чтения текущего запроса — из основной базы."""
+    routing = current.get()
+    if routing is not None:
+        routing.replica = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        routing = current.get()
+        if (
+            not replicas
+            or routing is None
+            or not routing.replica
+            or routing.wrote
+            or model._meta.app_label in PRIMARY_APPS
+        ):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = current.get()
+        if routing is not None:
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, 'DATABASE_REPLICAS', [])
@@ -0,0 +1,135 @@
+"""Статика с хешем в имени, заранее сжатая и отдаваемая самим Django.
+
+``collectstatic`` с ``CompressedManifestStaticFilesStorage`` копирует
+файлы в ``STATIC_ROOT`` под именами с хешем содержимого
+(``bootstrap.min.3f2a….css``) и кладёт рядом ``.gz`` и, если установлен
+``brotli``, ``.br``. ``{% static %}`` берёт имена из манифеста, поэтому
+такие файлы можно кэшировать навсегда.
+
+``StaticFilesMiddleware`` отдаёт ``STATIC_ROOT`` без веб-сервера:
+выбирает сжатый вариант по ``Accept-Encoding`` и отвечает 304 на
+повторные запросы.
+"""
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Уже сжатые форматы повторно не жмём.
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.json', '.xml', '.ico',
+                '.html', '.map')
+# Сжатый вариант нужен, только если он заметно меньше.
+MIN_SAVING = 0.95
+YEAR = 365 * 24 * 60 * 60
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хешами плюс ``.gz``/``.br`` рядом с каждым текстом."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Промежуточные имена CSS с прошлых проходов не нужны, только итог.
+        for name in paths:
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+                self.compress(self.stored_name(name))
+
+    def compress(self, name):
+        """Пишет сжатые варианты файла, возвращает их суффиксы."""
+        with self.open(name) as file:
+            data = file.read()
+        written = []
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * MIN_SAVING:
+                continue
+            path = self.path(name) + suffix
+            with open(path, 'wb') as file:
+                file.write(compressed)
+            written.append(suffix)
+        return written
+
+
+_hashed = {}
+
+
+def hashed_names():
+    """Имена файлов с хешем из манифеста; без него — пусто."""
+    files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    if _hashed.get('files') is not files:
+        _hashed.update(files=files, names=set(files.values()))
+    return _hashed['names']
+
+
+def _encodings(request):
+    tokens = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        token, _, weight = part.partition(';')
+        # «gzip;q=0» — явный отказ от кодировки.
+        if weight.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00'):
+            tokens.add(token.strip())
+    if 'br' in tokens:
+        yield 'br', '.br'
+    if 'gzip' in tokens:
+        yield 'gzip', '.gz'
+
+
+def serve(request, name):
+    """Ответ с файлом ``STATIC_ROOT/name`` или None, если файла нет."""
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        return None
+    encoding, variant = None, path
+    for candidate, suffix in _encodings(request):
+        if os.path.isfile(path + suffix):
+            encoding, variant = candidate, path + suffix
+            break
+    compressed = encoding or any(
+        os.path.isfile(path + suffix) for suffix, _ in _compressors())
+    stat = os.stat(variant)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding or "id"}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type = mimetypes.guess_type(name)[0]
+        response = FileResponse(
+            open(variant, 'rb'),
+            content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if compressed:
+        response['Vary'] = 'Accept-Encoding'
+    if name in hashed_names():
+        patch_cache_control(response, public=True, max_age=YEAR,
+                            immutable=True)
+    else:
+        patch_cache_control(response, public=True,
+                            max_age=settings.STATIC_MAX_AGE)
+    return response
@@ -0,0 +1,66 @@
+"""Фоновые задачи без внешнего брокера.
+
+Функция, обёрнутая в ``@task``, вызывается как обычно или ставится
+в очередь через ``.delay()``. Бэкенд очереди задаётся в
+``settings.TASKS``.
+"""
+import importlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'core.tasks.backends.ImmediateBackend'
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, max_retries, retry_delay):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь; аргументы должны сериализоваться в JSON."""
+        get_backend().enqueue(self, args, kwargs)
+
+    def retry_after(self, attempt):
+        return self.retry_delay * 2 ** attempt
+
+
+def task(func=None, *, max_retries=3, retry_delay=1):
+    def decorator(func):
+        wrapped = Task(func, max_retries, retry_delay)
+        registry[wrapped.name] = wrapped
+        return wrapped
+    return decorator(func) if func else decorator
+
+
+def get_task(name):
+    """Находит задачу по имени, импортируя её модуль при необходимости."""
+    if name not in registry:
+        importlib.import_module(name.rsplit('.', 1)[0])
+    return registry[name]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    config = getattr(settings, 'TASKS', {})
+    backend = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+    return backend(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'TASKS':
+        get_backend.cache_clear()
@@ -0,0 +1,209 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+
+from . import get_task
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBackend:
+    """Общая часть бэкендов: запуск с замером времени и мёртвые письма."""
+
+    def __init__(self, dead_letters=1000):
+        self.metrics = Metrics()
+        self.dead_letters = deque(maxlen=dead_letters)
+
+    def enqueue(self, task, args, kwargs):
+        # Обработчик должен увидеть данные, ради которых задача создана.
+        transaction.on_commit(
+            lambda: self.push(task.name, list(args), dict(kwargs)))
+
+    def push(self, name, args, kwargs):
+        raise NotImplementedError
+
+    def execute(self, name, args, kwargs):
+        """Выполняет задачу один раз; исключение пробрасывается дальше."""
+        task = get_task(name)
+        started = time.monotonic()
+        try:
+            task(*args, **kwargs)
+        except Exception:
+            self.metrics.record(name, time.monotonic() - started, False)
+            raise
+        self.metrics.record(name, time.monotonic() - started, True)
+
+    def bury(self, name, args, kwargs, error):
+        self.metrics.increment(name, 'dead')
+        self.dead_letters.append({
+            'name': name,
+            'args': args,
+            'kwargs': kwargs,
+            'error': error,
+        })
+        logger.error('Задача %s не выполнена: %s', name, error)
+
+
+class ImmediateBackend(BaseBackend):
+    """Выполняет задачу сразу в вызывающем потоке, повторы без пауз."""
+
+    def enqueue(self, task, args, kwargs):
+        self.push(task.name, list(args), dict(kwargs))
+
+    def push(self, name, args, kwargs):
+        max_retries = get_task(name).max_retries
+        for attempt in range(max_retries + 1):
+            try:
+                self.execute(name, args, kwargs)
+                return
+            except Exception as error:
+                if attempt == max_retries:
+                    self.bury(name, args, kwargs, repr(error))
+                else:
+                    self.metrics.increment(name, 'retried')
+
+
+class ThreadPoolBackend(BaseBackend):
+    """Пул потоков внутри процесса; очередь теряется при перезапуске."""
+
+    def __init__(self, workers=4, **kwargs):
+        super().__init__(**kwargs)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='tasks')
+
+    def push(self, name, args, kwargs, attempt=0):
+        self.executor.submit(self._run, name, args, kwargs, attempt)
+
+    def _run(self, name, args, kwargs, attempt):
+        close_old_connections()
+        try:
+            self.execute(name, args, kwargs)
+        except Exception as error:
+            task = get_task(name)
+            if attempt >= task.max_retries:
+                self.bury(name, args, kwargs, repr(error))
+                return
+            self.metrics.increment(name, 'retried')
+            timer = threading.Timer(
+                task.retry_after(attempt),
+                self.push, (name, args, kwargs, attempt + 1))
+            timer.daemon = True
+            timer.start()
+        finally:
+            close_old_connections()
+
+
+class SQLiteBackend(BaseBackend):
+    """Надёжная очередь в отдельном файле SQLite.
+
+    Задачи переживают перезапуск процесса; выполняет их команда
+    ``run_task_worker``. Задача, чей обработчик умер, снова становится
+    доступной через ``visibility_timeout`` секунд.
+    """
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_at REAL NOT NULL,
+            locked_at REAL,
+            last_error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS tasks_status_run_at
+            ON tasks (status, run_at);
+    '''
+
+    def __init__(self, path, visibility_timeout=300, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+
+    @property
+    def db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(self.SCHEMA)
+            self._local.db = db
+        return db
+
+    def push(self, name, args, kwargs):
+        self.db.execute(
+            'INSERT INTO tasks (name, payload, run_at) VALUES (?, ?, ?)',
+            (name, json.dumps([args, kwargs]), time.time()))
+
+    def claim(self):
+        """Забирает одну готовую задачу или возвращает None."""
+        now = time.time()
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                "SELECT id, name, payload, attempts FROM tasks "
+                "WHERE (status = 'queued' AND run_at <= ?) "
+                "OR (status = 'running' AND locked_at < ?) "
+                "ORDER BY run_at, id LIMIT 1",
+                (now, now - self.visibility_timeout)).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE tasks SET status = 'running', locked_at = ? "
+                    "WHERE id = ?", (now, row[0]))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return row
+
+    def run_next(self):
+        """Выполняет одну задачу; False, если очередь пуста."""
+        row = self.claim()
+        if row is None:
+            return False
+        pk, name, payload, attempts = row
+        args, kwargs = json.loads(payload)
+        try:
+            self.execute(name, args, kwargs)
+        except Exception as error:
+            self._fail(pk, name, args, kwargs, attempts, repr(error))
+        else:
+            self.db.execute('DELETE FROM tasks WHERE id = ?', (pk,))
+        return True
+
+    def _fail(self, pk, name, args, kwargs, attempts, error):
+        try:
+            task = get_task(name)
+        except (ImportError, KeyError):
+            task = None
+        if task is None or attempts >= task.max_retries:
+            self.db.execute(
+                "UPDATE tasks SET status = 'dead', last_error = ? "
+                "WHERE id = ?", (error, pk))
+            self.bury(name, args, kwargs, error)
+            return
+        self.metrics.increment(name, 'retried')
+        self.db.execute(
+            "UPDATE tasks SET status = 'queued', attempts = ?, run_at = ?, "
+            "last_error = ? WHERE id = ?",
+            (attempts + 1, time.time() + task.retry_after(attempts),
+             error, pk))
+
+    def stats(self):
+        return dict(self.db.execute(
+            'SELECT status, COUNT(*) FROM tasks GROUP BY status'))
+
+    def requeue_dead(self):
+        return self.db.execute(
+            "UPDATE tasks SET status = 'queued', attempts = 0, run_at = ? "
+            "WHERE status = 'dead'", (time.time(),)).rowcount
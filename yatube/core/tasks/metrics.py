@@ -0,0 +1,36 @@
+import threading
+from collections import defaultdict
+
+FIELDS = ('succeeded', 'failed', 'retried', 'dead')
+
+
+class Metrics:
+    """Счётчики и время выполнения задач по именам, потокобезопасно."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = defaultdict(self._empty)
+
+    @staticmethod
+    def _empty():
+        return dict.fromkeys(FIELDS + ('total_time', 'max_time'), 0)
+
+    def record(self, name, duration, succeeded):
+        with self._lock:
+            data = self._data[name]
+            data['succeeded' if succeeded else 'failed'] += 1
+            data['total_time'] += duration
+            data['max_time'] = max(data['max_time'], duration)
+
+    def increment(self, name, field):
+        with self._lock:
+            self._data[name][field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for name, data in self._data.items():
+                runs = data['succeeded'] + data['failed']
+                result[name] = dict(
+                    data, avg_time=data['total_time'] / runs if runs else 0)
+            return result
@@ -0,0 +1,72 @@
+"""Бюджеты SQL-запросов для тестов.
+
+Бюджет — наибольшее число запросов к базе за один HTTP-запрос
+к представлению. Бюджеты лежат в одном файле
+``settings.QUERY_BUDGETS_FILE``, чтобы их рост был виден на ревью.
+Запросы считает ``core.timing.TimingMiddleware``.
+"""
+import json
+
+from django.conf import settings
+
+from .timing import request_timed
+
+
+def load_budgets(path=None):
+    with open(path or settings.QUERY_BUDGETS_FILE, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_budgets(budgets, path=None):
+    with open(
+            path or settings.QUERY_BUDGETS_FILE, 'w',
+            encoding='utf-8') as file:
+        json.dump(budgets, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+class QueryBudget:
+    """Проверяет, что запросы внутри блока укладываются в бюджеты.
+
+    ::
+
+        with QueryBudget():
+            self.client.get(reverse('posts:index'))
+
+    ``observed`` хранит наибольшее число запросов по представлениям.
+    С ``check=False`` только наблюдает.
+    """
+
+    def __init__(self, budgets=None, check=True):
+        self.budgets = load_budgets() if budgets is None else budgets
+        self.check = check
+        self.observed = {}
+        self.violations = []
+
+    def __enter__(self):
+        request_timed.connect(self._record)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        request_timed.disconnect(self._record)
+        if exc_type is None and self.check:
+            self.assert_within_budget()
+
+    def _record(self, sender, view_name, timing, **kwargs):
+        if view_name is None:
+            return
+        count = timing.sql_count
+        self.observed[view_name] = max(
+            count, self.observed.get(view_name, 0))
+        budget = self.budgets.get(view_name)
+        if budget is not None and count > budget:
+            self.violations.append((view_name, count, budget))
+
+    def assert_within_budget(self):
+        if self.violations:
+            raise AssertionError(
+                'Превышен бюджет SQL-запросов ({}): {}'.format(
+                    settings.QUERY_BUDGETS_FILE,
+                    '; '.join(
+                        f'{view} — {count} при бюджете {budget}'
+                        for view, count, budget in self.violations)))
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core.asgi import WSGIToASGI
+from core.parallel import gather
+from core.timing import stats
+from posts.models import Post, User
+
+
+def http_scope(path, method='GET', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+def call(application, scope, body=b''):
+    """Прогоняет ASGI-запрос и возвращает отправленные сообщения."""
+    async def exchange():
+        messages = [
+            {'type': 'http.request', 'body': body[:3], 'more_body': True},
+            {'type': 'http.request', 'body': body[3:]},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await application(scope, receive, send)
+        return sent
+    return asyncio.run(exchange())
+
+
+def echo(environ, start_response):
+    start_response('201 Created', [('X-Cookie', environ['HTTP_COOKIE'])])
+    yield environ['wsgi.input'].read()
+    yield environ['PATH_INFO'].encode('latin-1')
+
+
+class WSGIToASGITests(SimpleTestCase):
+    def test_streams_wsgi_response(self):
+        """Тело запроса собирается, ответ уходит частями"""
+        sent = call(WSGIToASGI(echo), http_scope(
+            '/путь/', 'POST',
+            [(b'cookie', b'a=1'), (b'cookie', b'b=2')]), b'payload')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-cookie', b'a=1; b=2'), sent[0]['headers'])
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in sent[1:]),
+            b'payload' + '/путь/'.encode())
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_lifespan(self):
+        async def exchange():
+            messages = [
+                {'type': 'lifespan.startup'},
+                {'type': 'lifespan.shutdown'},
+            ]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await WSGIToASGI(echo)({'type': 'lifespan'}, receive, send)
+            return sent
+        self.assertEqual(asyncio.run(exchange()), [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_serves_django(self):
+        sent = call(
+            WSGIToASGI(get_wsgi_application()),
+            http_scope(reverse('about:tech')))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn('Python'.encode(), b''.join(
+            message.get('body', b'') for message in sent[1:]))
+
+
+def current_thread():
+    return threading.get_ident()
+
+
+@override_settings(PARALLEL_QUERIES=4)
+class GatherTests(TransactionTestCase):
+    def test_runs_in_pool_outside_transactions(self):
+        """Функции выполняются в других потоках, порядок сохраняется"""
+        first, second, value = gather(current_thread, current_thread, int)
+        self.assertEqual(first, threading.get_ident())
+        self.assertNotEqual(second, threading.get_ident())
+        self.assertEqual(value, 0)
+
+    def test_profile_reads_in_parallel(self):
+        """Профиль собирается параллельно, запросы пула учтены"""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост автора')
+        stats.reset()
+        response = self.client.get(
+            reverse('posts:profile', args=[author.username]))
+        self.assertEqual(response.context['author'], author)
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertGreaterEqual(stats.snapshot()[0]['sql_count'], 2)
+
+
+@override_settings(PARALLEL_QUERIES=4)
+class GatherInTransactionTests(TestCase):
+    def test_sequential_inside_transaction(self):
+        """Внутри транзакции пул не видел бы её данных"""
+        self.assertTrue(connection.in_atomic_block)
+        self.assertEqual(
+            gather(current_thread, current_thread),
+            [threading.get_ident()] * 2)
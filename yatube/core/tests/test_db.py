@@ -0,0 +1,137 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import PRIMARY_COOKIE
+from core.routers import PRIMARY, ReplicaRouter, Routing, current
+from posts.models import Post, User
+
+REPLICA = 'replica1'
+
+
+class SQLitePragmasTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение получает pragma из настроек"""
+        # 1 — NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def read_db(self, model, routing):
+        token = current.set(routing)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            current.reset(token)
+
+    def test_request_reads_from_replica(self):
+        """Чтение в запросе идёт в реплику"""
+        self.assertEqual(self.read_db(Post, Routing(replica=True)), REPLICA)
+
+    def test_reads_after_write_use_primary(self):
+        """После записи запрос читает из основной базы"""
+        routing = Routing(replica=True)
+        token = current.set(routing)
+        try:
+            self.assertEqual(self.router.db_for_write(Post), PRIMARY)
+        finally:
+            current.reset(token)
+        self.assertEqual(self.read_db(Post, routing), PRIMARY)
+
+    def test_primary_outside_requests_and_for_users(self):
+        """Вне запроса и для пользователей — основная база"""
+        self.assertEqual(self.router.db_for_read(Post), PRIMARY)
+        self.assertEqual(self.read_db(User, Routing(replica=True)), PRIMARY)
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'posts'))
+        self.assertTrue(self.router.allow_migrate(PRIMARY, 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TestCase):
+    """Основная база и отстающая реплика в отдельном файле SQLite."""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        path = os.path.join(cls.temp_dir, 'replica.sqlite3')
+        # Реплика — снимок пустой схемы основной базы.
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'], NAME=path)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_reads_go_to_replica(self):
+        """Поста, которого ещё нет в реплике, на его странице не видно"""
+        post = Post.objects.create(author=self.author, text='Ещё не доехал')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_cached_feeds_read_from_primary(self):
+        """Лента с ETag поколения не собирается из отстающей реплики"""
+        Post.objects.create(author=self.author, text='Ещё не доехал')
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('api:posts'),
+        ):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Ещё не доехал')
+
+    def test_writes_read_from_primary(self):
+        """POST находит объект, которого ещё нет в реплике"""
+        post = Post.objects.create(author=self.author, text='Ещё не доехал')
+        self.client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'})
+        self.assertEqual(post.comments.count(), 1)
+
+    def test_author_sees_own_post_after_write(self):
+        """После записи автор читает из основной базы"""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свой пост'})
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(
+            response.context['page_obj'][0].text, 'Свой пост')
+        self.assertEqual(Post.objects.using(REPLICA).count(), 0)
@@ -0,0 +1,76 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = 'css/bootstrap.min.css'
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE=(
+        'core.staticfiles.CompressedManifestStaticFilesStorage'),
+    SERVE_STATIC=True)
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.hashed = staticfiles_storage.stored_name(CSS)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+
+    def read(self, name):
+        with open(os.path.join(STATIC_ROOT, name), 'rb') as file:
+            return file.read()
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """Имена с хешем попадают в {% static %}, рядом лежит .gz"""
+        self.assertRegex(
+            self.hashed, r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        self.assertEqual(static(CSS), settings.STATIC_URL + self.hashed)
+        self.assertEqual(
+            gzip.decompress(self.read(self.hashed + '.gz')),
+            self.read(self.hashed))
+        self.assertFalse(os.path.exists(
+            os.path.join(STATIC_ROOT, 'img/logo.png.gz')))
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        response = self.client.get(
+            static(CSS), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            self.read(self.hashed + '.gz'))
+        repeat = self.client.get(
+            static(CSS), HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_plain_name_served_with_short_cache(self):
+        """Без хеша и без gzip у клиента — исходный файл ненадолго"""
+        response = self.client.get(
+            settings.STATIC_URL + CSS, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.STATIC_MAX_AGE}')
+        self.assertEqual(
+            b''.join(response.streaming_content), self.read(CSS))
+
+    def test_outside_static_root_not_served(self):
+        response = self.client.get(settings.STATIC_URL + '../manage.py')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.tasks import task
+from core.tasks.backends import ImmediateBackend, SQLiteBackend
+
+CALLS = []
+
+
+@task(max_retries=1, retry_delay=0)
+def remember(value):
+    CALLS.append(value)
+
+
+@task(max_retries=1, retry_delay=0)
+def explode():
+    raise RuntimeError('boom')
+
+
+class TaskBackendsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_immediate_backend_retries_then_buries(self):
+        """Упавшая задача повторяется и попадает в мёртвые"""
+        backend = ImmediateBackend()
+        backend.enqueue(remember, [1], {})
+        backend.enqueue(explode, [], {})
+        self.assertEqual(CALLS, [1])
+        metrics = backend.metrics.snapshot()
+        self.assertEqual(metrics[remember.name]['succeeded'], 1)
+        self.assertEqual(metrics[explode.name]['failed'], 2)
+        self.assertEqual(metrics[explode.name]['retried'], 1)
+        self.assertEqual(len(backend.dead_letters), 1)
+
+    def test_sqlite_backend_is_durable(self):
+        """Очередь SQLite переживает новый экземпляр бэкенда"""
+        path = os.path.join(self.temp_dir, 'tasks.sqlite3')
+        SQLiteBackend(path).push(remember.name, [2], {})
+        SQLiteBackend(path).push(explode.name, [], {})
+        worker = SQLiteBackend(path)
+        while worker.run_next():
+            pass
+        self.assertEqual(CALLS, [2])
+        self.assertEqual(worker.stats(), {'dead': 1})
+        self.assertEqual(worker.metrics.snapshot()[explode.name]['dead'], 1)
+        self.assertEqual(worker.requeue_dead(), 1)
+        self.assertEqual(worker.stats(), {'queued': 1})
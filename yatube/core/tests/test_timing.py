@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.timing import RequestTiming, ViewStats, stats
+from posts.models import Post, User
+
+
+class TimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.staff, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.client.force_login(self.staff)
+
+    def view_stats(self, view_name):
+        return next(
+            row for row in stats.snapshot() if row['view_name'] == view_name)
+
+    def test_server_timing_header(self):
+        """Staff получает Server-Timing с SQL, шаблонами и кэшем"""
+        header = self.client.get(reverse('posts:index'))['Server-Timing']
+        for metric in ('total;dur=', 'sql;dur=', 'template;dur=', 'cache;'):
+            self.assertIn(metric, header)
+        self.assertRegex(header, r'desc="[1-9]\d* queries"')
+
+    def test_no_header_for_visitors(self):
+        self.client.logout()
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_stats_by_view_name(self):
+        """Замеры копятся по имени представления"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        data = self.view_stats('posts:index')
+        self.assertEqual(data['requests'], 2)
+        self.assertEqual(sum(data['buckets']), 2)
+        self.assertGreater(data['sql_count'], 0)
+        self.assertGreater(data['template_time'], 0)
+        # Второй запрос отдан из кэша ленты.
+        self.assertGreater(data['cache_hits'], 0)
+        self.assertGreater(data['cache_misses'], 0)
+
+    def test_timing_page_for_staff_only(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('core:request_timing'))
+        self.assertIn(
+            'posts:index',
+            [row['view_name'] for row in response.context['views']])
+        self.client.logout()
+        response = self.client.get(reverse('core:request_timing'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ViewStatsTests(SimpleTestCase):
+    def test_percentiles_from_buckets(self):
+        view_stats = ViewStats()
+        for milliseconds in (5, 5, 5, 40, 3000):
+            view_stats.record('view', milliseconds / 1000, RequestTiming())
+        data = view_stats.snapshot()[0]
+        self.assertEqual(data['buckets'][0], 3)
+        self.assertEqual(data['p50'], 10)
+        self.assertIsNone(data['p95'])
@@ -0,0 +1,214 @@
+"""Замеры запросов по представлениям.
+
+``TimingMiddleware`` считает для каждого запроса общее время, число
+и время SQL-запросов, время отрисовки шаблонов и попадания в кэш.
+Замеры уходят в заголовок ``Server-Timing`` и копятся в гистограмме
+по ``resolver_match.view_name``; гистограмма своя у каждого процесса
+и видна staff на странице ``core:request_timing``.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.dispatch import Signal
+from django.template.backends.django import Template
+from django.utils.module_loading import import_string
+
+# Верхние границы корзин гистограммы, мс; последняя корзина — всё дольше.
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+FIELDS = ('sql_count', 'sql_time', 'template_time', 'cache_hits',
+          'cache_misses')
+
+_missing = object()
+
+
+class RequestTiming:
+    """Замеры одного запроса, время в секундах."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0
+        self.template_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def header(self, total):
+        return ', '.join((
+            f'total;dur={total * 1000:.1f}',
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'template;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+        ))
+
+
+current = ContextVar('request_timing', default=None)
+
+# Отправляется после каждого запроса: view_name, timing, total.
+request_timed = Signal()
+
+
+# Запросы одного HTTP-запроса могут идти из нескольких потоков.
+_sql_lock = threading.Lock()
+
+
+def record_sql(execute, sql, params, many, context):
+    """Обёртка для ``connection.execute_wrapper``."""
+    timing = current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        with _sql_lock:
+            timing.sql_count += 1
+            timing.sql_time += elapsed
+
+
+@contextmanager
+def recording_sql():
+    """Считает запросы всех соединений текущего потока."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(record_sql))
+        yield
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        timing = current.get()
+        if timing is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        sql_before = timing.sql_time
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            # Запросы, выполненные из шаблона, уже учтены в SQL.
+            timing.template_time += (
+                time.perf_counter() - started
+                - (timing.sql_time - sql_before))
+    wrapper.timed = True
+    return wrapper
+
+
+def _timed_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _missing, version)
+        timing = current.get()
+        if value is _missing:
+            if timing is not None:
+                timing.cache_misses += 1
+            return default
+        if timing is not None:
+            timing.cache_hits += 1
+        return value
+    wrapper.timed = True
+    return wrapper
+
+
+def _timed_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version)
+        timing = current.get()
+        if timing is not None:
+            timing.cache_hits += len(found)
+            timing.cache_misses += len(keys) - len(found)
+        return found
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument():
+    """Оборачивает отрисовку шаблонов и чтение из настроенных кэшей."""
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+    for config in settings.CACHES.values():
+        backend = import_string(config['BACKEND'])
+        if not getattr(backend.get, 'timed', False):
+            backend.get = _timed_get(backend.get)
+        # BaseCache.get_many сам зовёт get, оборачивать его не нужно.
+        if (backend.get_many is not BaseCache.get_many
+                and not getattr(backend.get_many, 'timed', False)):
+            backend.get_many = _timed_get_many(backend.get_many)
+
+
+class ViewStats:
+    """Гистограмма времени ответа и средние замеры по представлениям."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = defaultdict(self._empty)
+
+    @staticmethod
+    def _empty():
+        return dict(
+            dict.fromkeys(FIELDS + ('requests', 'total_time', 'max_time'), 0),
+            buckets=[0] * (len(BUCKETS) + 1))
+
+    def record(self, view_name, total, timing):
+        milliseconds = total * 1000
+        bucket = next(
+            (index for index, bound in enumerate(BUCKETS)
+             if milliseconds <= bound),
+            len(BUCKETS))
+        with self._lock:
+            data = self._data[view_name]
+            data['requests'] += 1
+            data['total_time'] += total
+            data['max_time'] = max(data['max_time'], total)
+            data['buckets'][bucket] += 1
+            for field in FIELDS:
+                data[field] += getattr(timing, field)
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self):
+        """Сводка по представлениям в мс, самые затратные в начале."""
+        with self._lock:
+            result = []
+            for name, data in self._data.items():
+                requests = data['requests']
+                result.append(dict(
+                    data,
+                    view_name=name,
+                    buckets=list(data['buckets']),
+                    avg_ms=data['total_time'] * 1000 / requests,
+                    max_ms=data['max_time'] * 1000,
+                    avg_sql_count=data['sql_count'] / requests,
+                    avg_sql_ms=data['sql_time'] * 1000 / requests,
+                    avg_template_ms=data['template_time'] * 1000 / requests,
+                    p50=self._percentile(data['buckets'], 0.5),
+                    p95=self._percentile(data['buckets'], 0.95),
+                ))
+        return sorted(result, key=lambda row: -row['total_time'])
+
+    @staticmethod
+    def _percentile(buckets, share):
+        """Верхняя граница корзины с перцентилем, мс; None — дольше всех."""
+        threshold = sum(buckets) * share
+        seen = 0
+        for bound, count in zip(BUCKETS + (None,), buckets):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return None
+
+
+stats = ViewStats()
@@ -1,5 +1,11 @@
 # core/views.py
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+from django.utils.cache import patch_cache_control
+from django.views import static
+
+from .timing import BUCKETS, stats
 
 
 def page_not_found(request, exception):
@@ -14,3 +20,24 @@ def csrf_failure(request, reason=''):
 
 def server_error(request, reason=''):
     return render(request, 'core/500.html', status=500)
+
+
+@staff_member_required
+def request_timing(request):
+    if request.method == 'POST':
+        stats.reset()
+        return redirect('core:request_timing')
+    return render(request, 'core/timing.html', {
+        'buckets': BUCKETS,
+        'views': stats.snapshot(),
+    })
+
+
+def serve_media(request, path, document_root=None):
+    """Медиафайлы при DEBUG; варианты с хешем в имени — навсегда."""
+    response = static.serve(request, path, document_root=document_root)
+    if path.startswith(settings.IMMUTABLE_MEDIA_PREFIXES):
+        patch_cache_control(
+            response, public=True, max_age=365 * 24 * 60 * 60,
+            immutable=True)
+    return response
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from .models import Post, Group, Comment, Follow, UserStats
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -21,3 +21,4 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.register(UserStats)
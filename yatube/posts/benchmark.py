@@ -0,0 +1,267 @@
+"""Нагрузочный прогон адресов ``posts.urls``.
+
+``seed`` наполняет базу данными, похожими на живые: авторы с разной
+популярностью, густой граф подписок, посты за год. ``run`` обходит
+каждый маршрут тестовым клиентом или через локальный WSGI-сервер и
+считает p50/p95/p99 времени ответа и SQL-запросы на запрос; число
+запросов берётся из статистики ``core.timing``.
+"""
+import io
+import itertools
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPRedirectHandler, build_opener
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.test import Client
+from django.urls import resolve, reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from core.timing import stats
+from . import search, timelines, urls
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark'
+PERCENTILES = (50, 95, 99)
+# GET по этим адресам меняет подписки, сбрасывает кэш лент и ставит
+# задачи: замер портил бы сам себя, поэтому их не обходим.
+MUTATING_ROUTES = ('profile_follow', 'profile_unfollow')
+
+
+def percentile(samples, share):
+    """Значение по ближайшему рангу."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+@contextmanager
+def explicit_pub_date():
+    """Отключает auto_now_add, чтобы посты легли на разные даты."""
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _bulk(model, objects):
+    # Размер пачки внутри куска Django подбирает под ограничения базы.
+    objects = iter(objects)
+    while True:
+        chunk = list(itertools.islice(objects, BATCH_SIZE))
+        if not chunk:
+            return
+        model.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def seed(users, posts, follows, groups, comments, seed=0, log=print):
+    """Наполняет базу; сигналы не срабатывают, счётчики пересчитываются."""
+    rng = random.Random(seed)
+    Faker.seed(seed)
+    fake = Faker('ru_RU')
+    password = make_password(PASSWORD)
+    first_id = (User.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0) + 1
+    _bulk(User, (
+        User(username=f'{fake.user_name()}_{first_id + number}',
+             first_name=fake.first_name(), last_name=fake.last_name(),
+             password=password)
+        for number in range(users)
+    ))
+    user_ids = list(User.objects.filter(
+        pk__gte=first_id).values_list('pk', flat=True))
+    # Популярность авторов по закону Ципфа: мало звёзд, много тихих.
+    weights = [1 / rank for rank in range(1, len(user_ids) + 1)]
+    log(f'Пользователей: {len(user_ids)}')
+
+    mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence(f'benchmark-{first_id}-{{0}}'))
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+
+    now = timezone.now()
+    with explicit_pub_date():
+        _bulk(Post, (
+            Post(text=fake.paragraph(nb_sentences=4),
+                 author_id=author_id,
+                 group_id=rng.choice(group_ids) if rng.random() < 0.6
+                 else None,
+                 pub_date=now - timedelta(seconds=rng.randrange(365 * 86400)))
+            for author_id in rng.choices(user_ids, weights, k=posts)
+        ))
+    log(f'Постов: {posts}')
+
+    def follow_pairs():
+        for user_id in user_ids:
+            authors = set(rng.choices(user_ids, weights, k=follows))
+            authors.discard(user_id)
+            for author_id in authors:
+                yield Follow(user_id=user_id, author_id=author_id)
+    _bulk(Follow, follow_pairs())
+    log(f'Подписок: {Follow.objects.count()}')
+
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids).values_list('pk', flat=True))
+    _bulk(Comment, (
+        Comment(post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                text=fake.sentence())
+        for _ in range(comments)
+    ))
+    Post.objects.update(comment_count=Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField()
+    ), 0))
+    log(f'Комментариев: {comments}')
+
+    output = io.StringIO()
+    call_command('rebuild_user_stats', stdout=output)
+    log(f'Счётчики: {output.getvalue().strip()}')
+    search.rebuild()
+    if timelines.enabled():
+        call_command('rebuild_timelines')
+
+
+def pick_reader():
+    """Читатель с постами и самым большим числом подписок."""
+    return User.objects.filter(
+        stats__posts_count__gt=0, stats__following_count__gt=0
+    ).order_by('-stats__following_count', 'pk').first()
+
+
+def routes(reader):
+    """Адрес для маршрутов ``posts.urls`` и глубокой страницы.
+
+    Маршруты из ``MUTATING_ROUTES`` пропускаются.
+    """
+    post = Post.objects.filter(author=reader).latest('pub_date')
+    author = Follow.objects.filter(user=reader).latest('pk').author
+    group = Group.objects.filter(posts__isnull=False).first()
+    word = next(iter(search.normalize(post.text)), 'пост')
+    values = {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+    }
+    result = {}
+    for pattern in urls.urlpatterns:
+        if pattern.name in MUTATING_ROUTES:
+            continue
+        kwargs = {
+            name: values[name] for name in pattern.pattern.converters}
+        result[pattern.name] = reverse(
+            f'{urls.app_name}:{pattern.name}', kwargs=kwargs)
+    result['search'] += '?' + urlencode({'q': word})
+    last_page = math.ceil(Post.objects.count() / settings.PAGE_SIZE)
+    result['index_deep_page'] = (
+        reverse('posts:index') + f'?page={max(last_page, 1)}')
+    return result
+
+
+def _view_queries(view_name):
+    for row in stats.snapshot():
+        if row['view_name'] == view_name:
+            return row['sql_count']
+    return 0
+
+
+class ClientDriver:
+    def __init__(self, reader):
+        self.client = Client()
+        self.client.force_login(reader)
+
+    def get(self, url):
+        return self.client.get(url).status_code
+
+    def close(self):
+        pass
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ServerDriver:
+    """Настоящий HTTP через wsgiref в соседнем потоке."""
+
+    def __init__(self, reader):
+        self.server = make_server(
+            '127.0.0.1', 0, WSGIHandler(), handler_class=_QuietHandler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        client = Client()
+        client.force_login(reader)
+        self.opener = build_opener(_NoRedirect)
+        cookie = settings.SESSION_COOKIE_NAME
+        self.opener.addheaders = [(
+            'Cookie', f'{cookie}={client.cookies[cookie].value}')]
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+
+    def get(self, url):
+        try:
+            with self.opener.open(self.base + url) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run(driver, addresses, requests, warmup=1):
+    """Обходит адреса по кругу и возвращает сводку по каждому."""
+    samples = {name: [] for name in addresses}
+    queries = {name: 0 for name in addresses}
+    statuses = {}
+    views = {
+        name: resolve(url.split('?')[0]).view_name
+        for name, url in addresses.items()
+    }
+    for _ in range(warmup):
+        for url in addresses.values():
+            driver.get(url)
+    for _ in range(requests):
+        for name, url in addresses.items():
+            before = _view_queries(views[name])
+            started = time.perf_counter()
+            statuses[name] = driver.get(url)
+            samples[name].append((time.perf_counter() - started) * 1000)
+            queries[name] += _view_queries(views[name]) - before
+    return {
+        name: dict(
+            url=addresses[name],
+            status=statuses[name],
+            requests=len(samples[name]),
+            mean_ms=sum(samples[name]) / len(samples[name]),
+            queries_per_request=queries[name] / len(samples[name]),
+            **{f'p{share}_ms': percentile(samples[name], share / 100)
+               for share in PERCENTILES},
+        )
+        for name in addresses
+    }
@@ -0,0 +1,134 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from core.routers import use_primary
+from .models import Post
+
+GENERATION_KEY = 'posts:generation:{}'
+EPOCH_KEY = 'posts:generation:epoch'
+PAGE_KEY = 'posts:page:{scope}:{generation}:{user}:{path}'
+# Счётчики видны всем процессам, страницы кэшируются в каждом свой.
+COUNTERS = 'generations'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def generation(scope):
+    """Текущее поколение области кэша.
+
+    Счётчик области заводит только ``bump``, поэтому адреса с любым
+    slug или именем не плодят ключей. Области без счётчика делят общую
+    эпоху: ``bump`` сдвигает её, когда заводит счётчик, так что
+    вытесненный счётчик не вернёт страницы старых поколений.
+    """
+    counters = caches[COUNTERS]
+    key = GENERATION_KEY.format(scope)
+    values = counters.get_many((key, EPOCH_KEY))
+    if key in values:
+        return values[key]
+    epoch = values.get(EPOCH_KEY)
+    if epoch is None:
+        counters.add(EPOCH_KEY, _now_ms(), None)
+        epoch = counters.get(EPOCH_KEY)
+    return f'e{epoch}'
+
+
+def bump(*scopes):
+    counters = caches[COUNTERS]
+    created = False
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            counters.incr(key)
+        except ValueError:
+            counters.set(key, _now_ms(), None)
+            created = True
+    if created:
+        counters.set(EPOCH_KEY, _now_ms(), None)
+
+
+def post_scopes(author_username, group_slug):
+    scopes = ['index', 'search', f'profile:{author_username}']
+    if group_slug:
+        scopes.append(f'group:{group_slug}')
+    return scopes
+
+
+def _scope_name(scope, kwarg, kwargs):
+    return f'{scope}:{kwargs[kwarg]}' if kwarg else scope
+
+
+def _path_hash(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def feed_etag(scope, kwarg=None):
+    """``etag_func`` для ``condition``: ETag ленты из поколения её области.
+
+    Совпавший If-None-Match отвечает 304 без единого запроса к базе.
+    Ответ с таким ETag не должен быть старше поколения, поэтому
+    view читает из основной базы, а не из отстающей реплики.
+    """
+    def etag(request, *args, **kwargs):
+        use_primary()
+        name = _scope_name(scope, kwarg, kwargs)
+        return hashlib.md5(':'.join((
+            name,
+            str(generation(name)),
+            str(request.user.pk or 'anon'),
+            _path_hash(request),
+        )).encode()).hexdigest()
+    return etag
+
+
+def post_etag(request, post_id):
+    """``etag_func`` страницы поста; без поста — None, и view даст 404.
+
+    В форме комментария CSRF-токен, а вход его меняет: страница
+    со старым токеном после 304 отвечала бы на отправку 403.
+    """
+    version = Post.objects.filter(pk=post_id).version()
+    if version is None:
+        return None
+    return hashlib.md5(':'.join((
+        str(post_id),
+        *map(str, version.values()),
+        str(request.user.pk or 'anon'),
+        request.META.get('CSRF_COOKIE', ''),
+    )).encode()).hexdigest()
+
+
+def cache_feed(scope, kwarg=None):
+    """Кэширует страницу ленты до смены поколения её области.
+
+    Ключ включает пользователя, поэтому шапка и кнопки подписки
+    не перетекают между посетителями.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            name = _scope_name(scope, kwarg, kwargs)
+            key = PAGE_KEY.format(
+                scope=name,
+                generation=generation(name),
+                user=request.user.pk or 'anon',
+                path=_path_hash(request),
+            )
+            response = cache.get(key)
+            if response is None:
+                # Страница из реплики легла бы в кэш под новым поколением.
+                use_primary()
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response, settings.FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,173 @@
+"""Обработка загруженных картинок постов.
+
+Оригинал с телефона в хранилище не попадает: при сохранении поста
+картинка поворачивается по EXIF, уменьшается до
+``IMAGE_MAX_DIMENSION`` по большей стороне и перекодируется
+в ``IMAGE_FORMAT`` без метаданных. Миниатюры потом строятся
+из небольшого файла, а размеры хранятся в самом посте.
+
+Варианты для ``srcset`` шириной ``VARIANT_WIDTHS`` с пропорциями
+``VARIANT_RATIO`` режет задача ``generate_variants`` после сохранения
+поста. Имя варианта выводится из хеша содержимого картинки
+(``Post.image_hash``), размера и формата с качеством, которыми варианты
+нарезаны (``Post.image_variants``), поэтому шаблону не нужно ничего
+проверять в хранилище, а файл под одним именем никогда не меняется
+и кэшируется с ``Cache-Control: immutable``.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+# Ширины вариантов и пропорции кадра, как у прежней миниатюры 960x339.
+VARIANT_WIDTHS = (480, 720, 960, 1440)
+VARIANT_RATIO = (960, 339)
+VARIANTS_DIR = 'posts/variants'
+
+
+def _flatten(image, fmt):
+    """Режим, который умеет формат; JPEG без прозрачности — на белом."""
+    if image.mode in ('RGB', 'L'):
+        return image
+    transparent = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    if not transparent:
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    if fmt == 'WEBP':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def prepare(source, max_dimension=None):
+    """Повёрнутая и уменьшенная картинка или None для анимации."""
+    max_dimension = max_dimension or settings.IMAGE_MAX_DIMENSION
+    with Image.open(source) as image:
+        if getattr(image, 'is_animated', False):
+            return None
+        # JPEG сразу декодируется в уменьшенном в 2–8 раз масштабе.
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return image
+
+
+def to_bytes(image, fmt=None, quality=None):
+    fmt = fmt or settings.IMAGE_FORMAT
+    image = _flatten(image, fmt)
+    options = {'quality': quality or settings.IMAGE_QUALITY}
+    if fmt == 'JPEG':
+        options.update(progressive=True, optimize=True)
+    output = io.BytesIO()
+    # Без exif= Pillow метаданные не пишет.
+    image.save(output, fmt, **options)
+    return output.getvalue()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def variant_sizes(width):
+    """Размеры вариантов для картинки шириной width, по возрастанию.
+
+    Шире оригинала не режем, но самый узкий вариант есть всегда.
+    """
+    widths = [size for size in VARIANT_WIDTHS if size <= width]
+    ratio_width, ratio_height = VARIANT_RATIO
+    return [
+        (size, round(size * ratio_height / ratio_width))
+        for size in widths or VARIANT_WIDTHS[:1]
+    ]
+
+
+def variants_suffix(fmt, quality):
+    return f'q{quality}.{EXTENSIONS[fmt]}'
+
+
+def variant_name(image_hash, size, suffix):
+    width, height = size
+    return (f'{VARIANTS_DIR}/{image_hash[:2]}/'
+            f'{image_hash[:20]}-{width}x{height}-{suffix}')
+
+
+def variants(post):
+    """Пары (url, ширина) вариантов картинки поста; пока не нарезаны — []."""
+    if not post.image_hash or not post.image_variants:
+        return []
+    storage = post.image.storage
+    return [
+        (storage.url(variant_name(
+            post.image_hash, size, post.image_variants)), size[0])
+        for size in variant_sizes(post.image_width)
+    ]
+
+
+def save_variants(image, image_hash, storage=None):
+    """Режет недостающие варианты в текущих формате и качестве.
+
+    Возвращает суффикс имён вариантов и число созданных файлов.
+    """
+    storage = storage or default_storage
+    fmt, quality = settings.IMAGE_FORMAT, settings.IMAGE_QUALITY
+    suffix = variants_suffix(fmt, quality)
+    created = 0
+    for size in variant_sizes(image.width):
+        name = variant_name(image_hash, size, suffix)
+        if storage.exists(name):
+            continue
+        variant = ImageOps.fit(image, size, Image.LANCZOS)
+        storage.save(name, ContentFile(to_bytes(variant, fmt, quality)))
+        created += 1
+    return suffix, created
+
+
+def process(post):
+    """Подменяет несохранённую картинку поста обработанной.
+
+    Варианты для новой картинки нарежет задача после сохранения.
+    """
+    upload = post.image.file
+    upload.seek(0)
+    try:
+        image = prepare(upload)
+    except OSError:
+        # Не картинка для Pillow: форма такое не пропустит.
+        return
+    post.image_hash = post.image_variants = ''
+    if image is None:
+        upload.seek(0)
+        with Image.open(upload) as animation:
+            post.image_width, post.image_height = animation.size
+        post.image_bytes = upload.size
+        return
+    data = to_bytes(image)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    fmt = settings.IMAGE_FORMAT
+    post.image = ContentFile(data, name=f'{stem}.{EXTENSIONS[fmt]}')
+    post.image_bytes = len(data)
+    post.image_width, post.image_height = image.size
+
+
+def generate_variants(post):
+    """Хеш и варианты сохранённой картинки поста.
+
+    Заполняет ``image_hash`` и ``image_variants`` и возвращает число
+    созданных вариантов; для анимации вариантов нет — None.
+    """
+    with post.image.open('rb') as file:
+        data = file.read()
+    image = prepare(io.BytesIO(data))
+    if image is None:
+        return None
+    post.image_hash = content_hash(data)
+    post.image_variants, created = save_variants(
+        image, post.image_hash, post.image.storage)
+    return created
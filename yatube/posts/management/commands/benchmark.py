@@ -0,0 +1,127 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import benchmark
+from posts.models import Follow, Post, User
+
+DRIVERS = {
+    'client': benchmark.ClientDriver,
+    'server': benchmark.ServerDriver,
+}
+NO_CACHE = {
+    alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    for alias in ('default', 'search', 'generations')
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа всех адресов posts.urls. Запускайте на '
+        'отдельной базе: DB_NAME=bench.sqlite3 python manage.py migrate, '
+        'затем benchmark --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Сначала наполнить базу тестовыми данными.'
+        )
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=50,
+            help='Подписок на пользователя.'
+        )
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument(
+            '--driver',
+            choices=sorted(DRIVERS),
+            default='client',
+            help='Тестовый клиент или HTTP к локальному WSGI-серверу.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Запросов на каждый адрес.'
+        )
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Замерять без кэшей (DummyCache).'
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона: показать изменение p95.'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            benchmark.seed(
+                options['users'], options['posts'], options['follows'],
+                options['groups'], options['comments'],
+                seed=options['random_seed'], log=self.stdout.write)
+        reader = benchmark.pick_reader()
+        if reader is None:
+            raise CommandError('База пуста: запустите с --seed.')
+        if options['no_cache']:
+            with override_settings(CACHES=NO_CACHE):
+                routes = self.measure(reader, options)
+        else:
+            routes = self.measure(reader, options)
+        result = {
+            'started': timezone.now().isoformat(),
+            'driver': options['driver'],
+            'cache': not options['no_cache'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'routes': routes,
+            'skipped': list(benchmark.MUTATING_ROUTES),
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+        self.report(routes, options['compare'])
+        self.stdout.write(f"Результаты: {options['output']}")
+
+    def measure(self, reader, options):
+        driver = DRIVERS[options['driver']](reader)
+        try:
+            return benchmark.run(
+                driver, benchmark.routes(reader),
+                options['requests'], options['warmup'])
+        finally:
+            driver.close()
+
+    def report(self, routes, compare):
+        baseline = {}
+        if compare:
+            with open(compare) as previous:
+                baseline = json.load(previous)['routes']
+        for name, data in routes.items():
+            line = (
+                f"{name:<20} {data['status']} "
+                f"p50 {data['p50_ms']:7.1f} мс  "
+                f"p95 {data['p95_ms']:7.1f} мс  "
+                f"p99 {data['p99_ms']:7.1f} мс  "
+                f"SQL {data['queries_per_request']:.1f}")
+            if name in baseline:
+                change = data['p95_ms'] / baseline[name]['p95_ms'] - 1
+                line += f'  p95 {change:+.0%}'
+            self.stdout.write(line)
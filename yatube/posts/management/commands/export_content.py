@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки '
+            'в NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог выгрузки.')
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=list(transfer.MODELS),
+            default=list(transfer.MODELS),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=transfer.CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить с контрольной точки прерванной выгрузки.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            transfer.export(
+                options['directory'], options['models'], options['format'],
+                chunk_size=options['chunk_size'], resume=options['resume'],
+                log=self.stdout.write)
+        except ValueError as error:
+            raise CommandError(error)
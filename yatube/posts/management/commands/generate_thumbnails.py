@@ -0,0 +1,64 @@
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+logger = logging.getLogger(__name__)
+
+
+def generate_safely(image_name):
+    """None или текст ошибки: одна битая картинка не останавливает пул."""
+    try:
+        generate(image_name)
+    except Exception as error:
+        logger.exception('Миниатюра для %s не создана', image_name)
+        return f'{type(error).__name__}: {error}'
+    return None
+
+
+class Command(BaseCommand):
+    help = ('Заранее создаёт миниатюры sorl для картинок постов без '
+            'вариантов srcset: анимаций и ещё не нарезанных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Число процессов; 1 — без пула, в текущем процессе.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+        )
+
+    def handle(self, *args, **options):
+        # С вариантами шаблоны миниатюру sorl не показывают.
+        images = list(
+            Post.objects.exclude(image='').filter(image_variants='')
+            .values_list('image', flat=True)
+            .iterator()
+        )
+        if options['workers'] <= 1:
+            errors = list(map(generate_safely, images))
+        else:
+            # Дочерние процессы не должны делить соединение с родителем.
+            connections.close_all()
+            with ProcessPoolExecutor(options['workers']) as pool:
+                errors = list(pool.map(
+                    generate_safely, images,
+                    chunksize=options['chunk_size']))
+        failed = [
+            (image, error) for image, error in zip(images, errors) if error
+        ]
+        for image, error in failed:
+            self.stderr.write(f'{image}: {error}')
+        self.stdout.write(
+            f'Обработано картинок: {len(images) - len(failed)}, '
+            f'с ошибками: {len(failed)}.')
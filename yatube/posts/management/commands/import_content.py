@@ -0,0 +1,65 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import caching, search, timelines, transfer
+from posts.models import Follow, Group, Post
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает группы, посты, комментарии и подписки '
+            'из выгрузки export_content.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог выгрузки.')
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=list(transfer.MODELS),
+            default=list(transfer.MODELS),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=transfer.CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить с контрольной точки прерванной загрузки.'
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты подписок.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            transfer.load(
+                options['directory'], options['models'],
+                chunk_size=options['chunk_size'], resume=options['resume'],
+                log=self.stdout.write)
+        except ValueError as error:
+            raise CommandError(error)
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Пользователи из выгрузки должны быть в базе.')
+        # Вставка идёт мимо сигналов: производные данные пересобираем,
+        # а кэш лент сбрасываем после них, чтобы не закэшировать старое.
+        if not options['no_rebuild']:
+            call_command('rebuild_user_stats', stdout=self.stdout)
+            search.rebuild()
+            if timelines.enabled():
+                call_command('rebuild_timelines', stdout=self.stdout)
+        caching.bump('index', 'search', *(
+            f'group:{slug}'
+            for slug in Group.objects.values_list('slug', flat=True)))
+        # Счётчики и ленты профилей у всех авторов и подписчиков.
+        usernames = Post.objects.order_by().values_list(
+            'author__username').union(
+            Follow.objects.values_list('user__username'),
+            Follow.objects.values_list('author__username'))
+        for chunk in transfer.chunks(
+                usernames.iterator(), options['chunk_size']):
+            caching.bump(*(f'profile:{username}' for username, in chunk))
@@ -0,0 +1,71 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+from posts import caching, images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Уменьшает и перекодирует картинки постов, '
+            'загруженные до обработки при сохранении, '
+            'и режет недостающие варианты для srcset.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--variants',
+            action='store_true',
+            help='Проверить варианты всех картинок, например после '
+                 'смены IMAGE_FORMAT или IMAGE_QUALITY.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            image_bytes__isnull=True).select_related('author', 'group')
+        processed = missing = 0
+        for post in posts.iterator():
+            original = post.image.name
+            try:
+                with post.image.open('rb') as file:
+                    content = file.read()
+            except OSError:
+                missing += 1
+                continue
+            # Несохранённый файл Post.save обработает как новую загрузку.
+            post.image = ContentFile(content, name=os.path.basename(original))
+            post.save(update_fields=[
+                'image', 'image_width', 'image_height', 'image_bytes',
+                'image_hash', 'updated'])
+            if post.image.name != original:
+                post.image.storage.delete(original)
+            processed += 1
+        posts = Post.objects.exclude(image='').filter(
+            image_bytes__isnull=False)
+        if not options['variants']:
+            posts = posts.filter(image_variants='')
+        variants = 0
+        scopes = set()
+        posts = posts.select_related('author', 'group').only(
+            'image', 'image_hash', 'image_variants', 'author',
+            'author__username', 'group', 'group__slug')
+        for post in posts.iterator():
+            try:
+                created = images.generate_variants(post)
+            except OSError:
+                missing += 1
+                continue
+            if created is None:
+                continue
+            variants += created
+            # update(): updated не трогаем, порядок лент тот же.
+            Post.objects.filter(pk=post.pk).update(
+                image_hash=post.image_hash,
+                image_variants=post.image_variants)
+            scopes.update(caching.post_scopes(
+                post.author.username,
+                post.group.slug if post.group_id else None))
+        caching.bump(*scopes)
+        self.stdout.write(
+            f'Обработано картинок: {processed}, не найдено: {missing}, '
+            f'создано вариантов: {variants}.')
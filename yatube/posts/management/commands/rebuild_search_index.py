@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов.'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        backend = type(search.get_backend()).__name__
+        self.stdout.write(
+            f'Проиндексировано постов: {Post.objects.count()} ({backend}).')
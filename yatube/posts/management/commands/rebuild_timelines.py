@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import Follow, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def handle(self, *args, **options):
+        TimelineEntry.objects.exclude(
+            user__in=Follow.objects.values('user')).delete()
+        readers = User.objects.filter(
+            pk__in=Follow.objects.values('user')).iterator()
+        total = 0
+        for user in readers:
+            timelines.rebuild(user)
+            total += 1
+        self.stdout.write(f'Пересобрано лент: {total}.')
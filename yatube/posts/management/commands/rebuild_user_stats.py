@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import caching
+from posts.models import UserStats
+
+FIELDS = {
+    'posts_count': 'actual_posts',
+    'following_count': 'actual_following',
+    'followers_count': 'actual_followers',
+}
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и проверяет счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить счётчики, ничего не меняя.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stored = {
+            stats.user_id: stats for stats in UserStats.objects.iterator()
+        }
+        missing, stale, changed = [], [], []
+        for user in UserStats.actual_counts().iterator():
+            actual = {
+                field: getattr(user, source)
+                for field, source in FIELDS.items()
+            }
+            stats = stored.get(user.pk)
+            if stats is None:
+                missing.append(UserStats(user_id=user.pk, **actual))
+                changed.append(user.username)
+                continue
+            if any(getattr(stats, f) != v for f, v in actual.items()):
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                stale.append(stats)
+                changed.append(user.username)
+        if options['check']:
+            if missing or stale:
+                raise CommandError(
+                    f'Расхождения: нет записей {len(missing)}, '
+                    f'устаревших {len(stale)}.'
+                )
+            self.stdout.write('Счётчики в порядке.')
+            return
+        # Размер пачки вставки Django подбирает под ограничения базы.
+        UserStats.objects.bulk_create(missing)
+        UserStats.objects.bulk_update(
+            stale, list(FIELDS), batch_size=batch_size)
+        # Счётчики видны в профиле: его кэш и ETag устарели.
+        caching.bump(*(f'profile:{username}' for username in changed))
+        self.stdout.write(
+            f'Создано {len(missing)}, исправлено {len(stale)}.')
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        options = {row[0] for row in cursor.fetchall()}
+        if 'ENABLE_FTS5' not in options:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"text, group_title, tokenize='unicode61 remove_diacritics 2')")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, text, group_title) "
+            f"SELECT posts_post.id, posts_post.text, "
+            f"COALESCE(posts_group.title, '') FROM posts_post "
+            f"LEFT JOIN posts_group ON posts_post.group_id = posts_group.id")
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Поисковый индекс',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_posting'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:40
+
+import re
+
+from django.db import migrations
+
+# Копия нормализации из posts.search на момент миграции: её правки
+# не должны менять то, что делает уже применённая миграция.
+FTS_TABLE = 'posts_post_fts'
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+STOP_WORDS = frozenset((
+    'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'во', 'вот',
+    'все', 'всё', 'вы', 'да', 'для', 'до', 'его', 'ее', 'её', 'ей', 'если',
+    'есть', 'еще', 'ещё', 'же', 'за', 'из', 'или', 'им', 'их', 'как', 'ко',
+    'когда', 'ли', 'мне', 'мы', 'на', 'над', 'не', 'нет', 'ни', 'но',
+    'ну', 'об', 'он', 'она', 'они', 'оно', 'от', 'по', 'под', 'при',
+    'так', 'там', 'то', 'тоже', 'только', 'ты', 'уже', 'что', 'это',
+    'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'in', 'is', 'it',
+    'of', 'on', 'or', 'the', 'to', 'was', 'with',
+))
+
+
+def normalize(text):
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.casefold().replace('ё', 'е'))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def normalize_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if FTS_TABLE not in connection.introspection.table_names():
+        return
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.select_related('group').only(
+        'id', 'text', 'group__title')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for post in posts.iterator():
+            group_title = post.group.title if post.group_id else ''
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+                f'VALUES (%s, %s, %s)',
+                [post.pk, ' '.join(normalize(post.text)),
+                 ' '.join(normalize(group_title))])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_fts_table, migrations.RunPython.noop),
+    ]
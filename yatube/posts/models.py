@@ -1,6 +1,12 @@
 from django.db import models
+from django.db.models import (
+    Count, F, IntegerField, OuterRef, Subquery
+)
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
+from . import images
+
 User = get_user_model()
 
 
@@ -27,6 +33,57 @@ class Group(models.Model):
         return self.title
 
 
+FEED_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'updated',
+    'image',
+    'image_width',
+    'image_hash',
+    'image_variants',
+    'comment_count',
+    'author',
+    'author__username',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа подгружаются тем же запросом."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def detail(self):
+        """Пост для отдельной страницы с полным профилем автора."""
+        return self.select_related('author__stats', 'group')
+
+    def version(self):
+        """Всё, от чего зависит страница поста, одним запросом по pk.
+
+        Последний комментарий берётся подзапросом по индексу внешнего
+        ключа: удаление одного и новый комментарий не сохранят счётчик.
+        """
+        last_comment = Comment.objects.filter(
+            post=OuterRef('pk')).order_by('-created', '-id')
+        return self.annotate(
+            last_comment_at=Subquery(last_comment.values('created')[:1]),
+        ).values(
+            'updated', 'comment_count', 'last_comment_at',
+            'author__stats__posts_count',
+            'author__first_name', 'author__last_name', 'group__title',
+            'image_hash', 'image_variants',
+        ).first()
+
+    def bump_comments(self, post_id, delta):
+        posts = self.filter(pk=post_id)
+        if delta < 0:
+            posts = posts.filter(comment_count__gte=-delta)
+        posts.update(comment_count=F('comment_count') + delta)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='текст',
@@ -37,6 +94,10 @@ class Post(models.Model):
         verbose_name='дата',
         db_index=True
     )
+    updated = models.DateTimeField(
+        'Изменён',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -56,15 +117,78 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False
+    )
+    image_bytes = models.PositiveIntegerField(
+        'Размер картинки, байт',
+        null=True,
+        editable=False
+    )
+    image_hash = models.CharField(
+        'Хеш картинки',
+        max_length=64,
+        blank=True,
+        editable=False
+    )
+    image_variants = models.CharField(
+        'Формат вариантов картинки',
+        max_length=16,
+        blank=True,
+        editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
+        indexes = [
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date'),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            images.process(self)
+        elif not self.image:
+            self.image_width = self.image_height = self.image_bytes = None
+            self.image_hash = self.image_variants = ''
+        super().save(*args, **kwargs)
+
+    @property
+    def fragment_version(self):
+        """Всё, от чего зависит отрисовка поста в ленте."""
+        group = (self.group.slug, self.group.title) if self.group_id else ()
+        return (
+            self.updated.timestamp(),
+            self.comment_count,
+            self.image_hash,
+            self.image_variants,
+            self.author.username,
+            *group,
+        )
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -115,3 +239,146 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='unique_follower')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_post')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_post'),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author'),
+        ]
+
+
+class SearchPosting(models.Model):
+    """Запись инвертированного индекса: слово встречается в посте."""
+    term = models.CharField(
+        'Слово',
+        max_length=64
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_postings',
+        verbose_name='Пост'
+    )
+    weight = models.FloatField('Вес')
+
+    class Meta:
+        verbose_name = 'Поисковый индекс'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_posting')
+        ]
+
+
+def _count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Постов',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}'
+
+    @staticmethod
+    def actual_counts():
+        """Пользователи с честно посчитанными счётчиками."""
+        return User.objects.annotate(
+            actual_posts=_count_subquery(Post, 'author'),
+            actual_following=_count_subquery(Follow, 'user'),
+            actual_followers=_count_subquery(Follow, 'author'),
+        )
+
+    @classmethod
+    def rebuild(cls, user_id):
+        user = cls.actual_counts().get(pk=user_id)
+        stats, _ = cls.objects.update_or_create(user_id=user_id, defaults={
+            'posts_count': user.actual_posts,
+            'following_count': user.actual_following,
+            'followers_count': user.actual_followers,
+        })
+        return stats
+
+    @classmethod
+    def bump(cls, user_id, field, delta):
+        """Атомарно сдвигает счётчик; недостающую запись пересчитывает."""
+        stats = cls.objects.filter(user_id=user_id)
+        if delta < 0:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+        updated = stats.update(**{field: F(field) + delta})
+        if not updated and delta > 0:
+            cls.rebuild(user_id)
+
+    @classmethod
+    def for_user(cls, user):
+        try:
+            return user.stats
+        except cls.DoesNotExist:
+            return cls.rebuild(user.pk)
@@ -0,0 +1,146 @@
+import base64
+import binascii
+import heapq
+import json
+from functools import partial
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from core.parallel import gather
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, position):
+    """Упаковывает позицию (pub_date, id) в непрозрачный токен."""
+    pub_date, pk = position
+    raw = json.dumps([direction, pub_date.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (direction, pub_date, id) или None для битого токена."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, pub_date, pk = json.loads(raw.decode())
+        pub_date = parse_datetime(pub_date)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    if not isinstance(pk, int):
+        return None
+    return direction, pub_date, pk
+
+
+def position_of(obj, key='id'):
+    """Позиция (pub_date, id) объекта модели или строки ``values()``."""
+    if isinstance(obj, dict):
+        return obj['pub_date'], obj[key]
+    return obj.pub_date, getattr(obj, key)
+
+
+def seek(queryset, position, key='id'):
+    """Упорядочивает выборку в порядке обхода от позиции курсора."""
+    queryset = queryset.order_by('-pub_date', f'-{key}')
+    if position is None:
+        return queryset
+    direction, pub_date, pk = position
+    if direction == NEXT:
+        return queryset.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, **{f'{key}__lt': pk}))
+    return queryset.filter(
+        Q(pub_date__gt=pub_date)
+        | Q(pub_date=pub_date, **{f'{key}__gt': pk})
+    ).reverse()
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id).
+
+    Страница выбирается условием по индексу ``pub_date`` и ``LIMIT``,
+    поэтому стоит одинаково на любой глубине. ``count`` остаётся
+    ленивым и не вычисляется, пока к нему никто не обратился.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, key='id'):
+        self.key = key
+        super().__init__(
+            object_list.order_by('-pub_date', f'-{key}'), per_page)
+
+    def get_page(self, token):
+        position = decode_cursor(token) if token else None
+        direction = position[0] if position else None
+        return self.build_page(self.fetch(position), direction)
+
+    def fetch(self, position):
+        """Первые per_page + 1 пар (позиция, объект) в порядке обхода."""
+        objects = seek(self.object_list, position, self.key)
+        return [
+            (position_of(obj, self.key), obj)
+            for obj in objects[:self.per_page + 1]
+        ]
+
+    def build_page(self, items, direction):
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+        has_next = has_more if direction != PREVIOUS else True
+        has_previous = direction is not None and (
+            has_more if direction == PREVIOUS else True)
+        page = Page([obj for _, obj in items], 1, self)
+        page.next_cursor = (
+            encode_cursor(NEXT, items[-1][0])
+            if has_next and items else None)
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, items[0][0])
+            if has_previous and items else None)
+        return page
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по k-way слиянию нескольких лент.
+
+    ``sources`` — пары (queryset, key), где key указывает поле с id
+    поста. Каждая лента читается своим диапазоном по индексу, затем
+    ленты сливаются по (pub_date, id); повторы одного поста
+    схлопываются.
+    """
+
+    def __init__(self, sources, per_page):
+        self.sources = sources
+        Paginator.__init__(self, [], per_page)
+
+    @property
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.sources)
+
+    def _stream(self, queryset, key, position):
+        return [
+            (position_of(obj, key), obj)
+            for obj in seek(queryset, position, key)[:self.per_page + 1]
+        ]
+
+    def fetch(self, position):
+        backward = position is not None and position[0] == PREVIOUS
+        # Ленты независимы и читаются одновременно (см. core.parallel).
+        streams = gather(*(
+            partial(self._stream, queryset, key, position)
+            for queryset, key in self.sources
+        ))
+        items = []
+        merged = heapq.merge(
+            *streams, key=lambda item: item[0], reverse=not backward)
+        for item in merged:
+            if items and items[-1][0] == item[0]:
+                continue
+            items.append(item)
+            if len(items) > self.per_page:
+                break
+        return items
@@ -0,0 +1,251 @@
+"""Полнотекстовый поиск по постам и названиям групп.
+
+На SQLite со сборкой FTS5 индекс живёт в виртуальной таблице
+``posts_post_fts``; на остальных базах — в таблице ``SearchPosting``
+с весами, посчитанными в Python. Оба индекса обновляются сигналами
+при сохранении и удалении поста.
+
+Текст и запрос проходят одну нормализацию, а найденные id кэшируются
+в ``caches['search']`` до смены поколения ``search``.
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count
+
+from . import caching
+from .models import Post, SearchPosting
+
+FTS_TABLE = 'posts_post_fts'
+TOKEN_RE = re.compile(r'\w+')
+# Длиннее колонки SearchPosting.term слово не влезет (PostgreSQL упадёт);
+# запрос режется так же, поэтому такие слова всё равно находятся.
+MAX_TERM_LENGTH = SearchPosting._meta.get_field('term').max_length
+GROUP_TITLE_WEIGHT = 2
+BATCH_SIZE = 500
+MAX_QUERY_TERMS = 16
+CACHED_RESULTS = 200
+RESULTS_KEY = 'posts:search:{generation}:{terms}'
+STOP_WORDS = frozenset((
+    'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'во', 'вот',
+    'все', 'всё', 'вы', 'да', 'для', 'до', 'его', 'ее', 'её', 'ей', 'если',
+    'есть', 'еще', 'ещё', 'же', 'за', 'из', 'или', 'им', 'их', 'как', 'ко',
+    'когда', 'ли', 'мне', 'мы', 'на', 'над', 'не', 'нет', 'ни', 'но',
+    'ну', 'об', 'он', 'она', 'они', 'оно', 'от', 'по', 'под', 'при',
+    'так', 'там', 'то', 'тоже', 'только', 'ты', 'уже', 'что', 'это',
+    'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'in', 'is', 'it',
+    'of', 'on', 'or', 'the', 'to', 'was', 'with',
+))
+
+_fts5_tables = {}
+
+
+def normalize(text):
+    """Слова текста без регистра, с «ё» как «е» и без стоп-слов."""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.casefold().replace('ё', 'е'))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def fts5_available():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_tables:
+        _fts5_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names())
+    return _fts5_tables[name]
+
+
+def _documents(posts):
+    for post in posts:
+        yield (
+            post.pk,
+            normalize(post.text),
+            normalize(post.group.title) if post.group_id else [],
+        )
+
+
+class FTS5Backend:
+    def index(self, documents):
+        with connection.cursor() as cursor:
+            for pk, text, group_title in documents:
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+                    f'VALUES (%s, %s, %s)',
+                    [pk, ' '.join(text), ' '.join(group_title)])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    @staticmethod
+    def _match(terms):
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [self._match(terms)])
+            return cursor.fetchone()[0]
+
+    def search(self, terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 1.0, %s), rowid DESC '
+                f'LIMIT %s OFFSET %s',
+                [self._match(terms), GROUP_TITLE_WEIGHT, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostingsBackend:
+    """Инвертированный индекс в обычной таблице для любой базы."""
+
+    def index(self, documents):
+        postings, post_ids = [], []
+        for pk, text, group_title in documents:
+            post_ids.append(pk)
+            weights = Counter(text)
+            for term in group_title:
+                weights[term] += GROUP_TITLE_WEIGHT
+            total = sum(weights.values()) or 1
+            postings.extend(
+                SearchPosting(term=term, post_id=pk, weight=count / total)
+                for term, count in weights.items())
+        SearchPosting.objects.filter(post_id__in=post_ids).delete()
+        SearchPosting.objects.bulk_create(postings, batch_size=BATCH_SIZE)
+
+    def remove(self, post_id):
+        SearchPosting.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchPosting.objects.all().delete()
+
+    @staticmethod
+    def _matches(terms):
+        return SearchPosting.objects.filter(term__in=terms).values(
+            'post').annotate(matched=Count('term')).filter(
+            matched=len(set(terms)))
+
+    def count(self, terms):
+        return self._matches(terms).count()
+
+    def search(self, terms, offset, limit):
+        terms = set(terms)
+        total = Post.objects.count() or 1
+        frequencies = dict(
+            SearchPosting.objects.filter(term__in=terms)
+            .values_list('term').annotate(df=Count('post')))
+        idf = {
+            term: math.log(1 + total / frequencies.get(term, 1))
+            for term in terms
+        }
+        scores = Counter()
+        postings = SearchPosting.objects.filter(
+            term__in=terms,
+            post__in=self._matches(terms).values('post')
+        ).values_list('post_id', 'term', 'weight')
+        for post_id, term, weight in postings.iterator():
+            scores[post_id] += weight * idf[term]
+        ranked = sorted(scores, key=lambda pk: (-scores[pk], -pk))
+        return ranked[offset:offset + limit]
+
+
+def get_backend():
+    return FTS5Backend() if fts5_available() else PostingsBackend()
+
+
+def index_post(post):
+    get_backend().index(_documents([post]))
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def reindex(posts):
+    """Переиндексирует выборку постов пачками."""
+    backend = get_backend()
+    posts = posts.select_related('group').only(
+        'id', 'text', 'group', 'group__title')
+    batch = []
+    for post in posts.iterator():
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            backend.index(_documents(batch))
+            batch = []
+    if batch:
+        backend.index(_documents(batch))
+
+
+def rebuild():
+    get_backend().clear()
+    reindex(Post.objects.all())
+
+
+class SearchResults:
+    """Ленивая последовательность найденных постов для Paginator.
+
+    Число результатов и первые ``CACHED_RESULTS`` id берутся из кэша,
+    к индексу обращаемся только за более глубокими страницами.
+    """
+
+    def __init__(self, query):
+        self.terms = sorted(set(normalize(query)))[:MAX_QUERY_TERMS]
+        self.backend = get_backend()
+        self._cached = None
+
+    def _results(self):
+        if self._cached is None:
+            key = RESULTS_KEY.format(
+                generation=caching.generation('search'),
+                terms=hashlib.md5(' '.join(self.terms).encode()).hexdigest())
+            self._cached = caches['search'].get(key)
+            if self._cached is None:
+                self._cached = (
+                    self.backend.count(self.terms),
+                    self.backend.search(self.terms, 0, CACHED_RESULTS))
+                caches['search'].set(key, self._cached)
+        return self._cached
+
+    def count(self):
+        return self._results()[0] if self.terms else 0
+
+    def __len__(self):
+        return self.count()
+
+    def ids(self, start, stop):
+        """id найденных постов с позиции start по stop в порядке ранга."""
+        if not self.terms or stop <= start:
+            return []
+        count, ids = self._results()
+        if stop <= len(ids) or len(ids) == count:
+            return ids[start:stop]
+        return self.backend.search(self.terms, start, stop - start)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        ids = self.ids(start, stop)
+        if not ids:
+            return []
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,129 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, search, tasks, timelines
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _bump_post_feeds(post_id):
+    post = Post.objects.filter(pk=post_id).values(
+        'author__username', 'group__slug').first()
+    if post:
+        caching.bump(*caching.post_scopes(
+            post['author__username'], post['group__slug']))
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    instance._previous_group_slug = None
+    instance._previous_image = None
+    if instance.pk:
+        instance._previous_group_slug, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group__slug', 'image').first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.bump(instance.author_id, 'posts_count', 1)
+        if timelines.enabled():
+            tasks.fan_out_post.delay(instance.pk)
+    scopes = caching.post_scopes(
+        instance.author.username,
+        instance.group.slug if instance.group_id else None)
+    if instance._previous_group_slug:
+        scopes.append(f'group:{instance._previous_group_slug}')
+    caching.bump(*scopes)
+    if (instance.image
+            and instance.image.name != instance._previous_image):
+        tasks.generate_variants.delay(instance.pk)
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    UserStats.bump(instance.author_id, 'posts_count', -1)
+    search.remove_post(instance.pk)
+    caching.bump(*caching.post_scopes(
+        instance.author.username,
+        instance.group.slug if instance.group_id else None))
+
+
+def _bump_follow_profiles(follow):
+    caching.bump(*(
+        f'profile:{username}'
+        for username in User.objects.filter(
+            pk__in=(follow.user_id, follow.author_id)
+        ).values_list('username', flat=True)
+    ))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        UserStats.bump(instance.user_id, 'following_count', 1)
+        UserStats.bump(instance.author_id, 'followers_count', 1)
+        _bump_follow_profiles(instance)
+        if timelines.enabled():
+            tasks.backfill_timeline.delay(
+                instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    UserStats.bump(instance.user_id, 'following_count', -1)
+    UserStats.bump(instance.author_id, 'followers_count', -1)
+    _bump_follow_profiles(instance)
+    if timelines.enabled():
+        timelines.prune(instance.user_id, instance.author_id)
+        # Автор мог опуститься до лимита: его посты снова в лентах.
+        if (timelines.fanout_limited()
+                and not timelines.is_popular(instance.author_id)):
+            tasks.backfill_followers.delay(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.bump_comments(instance.post_id, 1)
+        _bump_post_feeds(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Post.objects.bump_comments(instance.post_id, -1)
+    _bump_post_feeds(instance.post_id)
+
+
+def _bump_group_feeds(group, *slugs):
+    """Название группы есть на её странице и в постах всех лент."""
+    caching.bump('index', 'search', *(f'group:{slug}' for slug in slugs), *(
+        f'profile:{username}'
+        for username in User.objects.filter(posts__group=group)
+        .values_list('username', flat=True).distinct()
+    ))
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        slugs = {instance.slug, instance._previous_slug} - {None}
+        _bump_group_feeds(instance, *slugs)
+        tasks.reindex_group.delay(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления у постов уже нет группы, авторов не найти.
+    _bump_group_feeds(instance, instance.slug)
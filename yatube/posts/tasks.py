@@ -0,0 +1,62 @@
+from core.tasks import task
+
+from . import caching, images, search, thumbnails, timelines
+from .models import Follow, Post
+
+
+@task(max_retries=2)
+def generate_thumbnails(image_name):
+    thumbnails.generate(image_name)
+
+
+@task(max_retries=2)
+def generate_variants(post_id):
+    post = Post.objects.filter(pk=post_id).select_related(
+        'author', 'group').only(
+        'image', 'image_width', 'author', 'author__username',
+        'group', 'group__slug').first()
+    if post is None or not post.image:
+        return
+    if images.generate_variants(post) is None:
+        # Анимацию в шаблонах показывает миниатюра sorl.
+        thumbnails.generate(post.image.name)
+        return
+    # Пока резали, картинку могли заменить: её варианты нарежет своя задача.
+    # update(): updated не трогаем, порядок лент тот же.
+    if Post.objects.filter(pk=post.pk, image=post.image.name).update(
+            image_hash=post.image_hash, image_variants=post.image_variants):
+        caching.bump(*caching.post_scopes(
+            post.author.username,
+            post.group.slug if post.group_id else None))
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'author', 'pub_date').first()
+    if post is not None:
+        timelines.fan_out(post)
+
+
+@task
+def backfill_timeline(user_id, author_id):
+    # Пока задача ждала очереди, читатель мог отписаться.
+    follows = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    follow = follows.select_related('user', 'author').first()
+    if follow is None:
+        return
+    timelines.backfill(follow.user, follow.author)
+    # Отписка во время заполнения: её prune мог пройти раньше нас.
+    if not follows.exists():
+        timelines.prune(follow.user, follow.author)
+
+
+@task
+def backfill_followers(author_id):
+    timelines.backfill_followers(author_id)
+
+
+@task
+def reindex_group(group_id):
+    search.reindex(Post.objects.filter(group_id=group_id))
+    caching.bump('search')
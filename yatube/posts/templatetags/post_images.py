@@ -0,0 +1,30 @@
+from django import template
+
+from posts import images
+
+register = template.Library()
+
+FEED_SIZES = '(min-width: 992px) 960px, 100vw'
+
+
+@register.inclusion_tag('posts/includes/image.html')
+def post_image(post, sizes=FEED_SIZES, lazy=True):
+    """Картинка поста с srcset из вариантов или миниатюрой sorl."""
+    variants = images.variants(post)
+    if not variants:
+        return {'post': post, 'variants': None}
+    # src для браузеров без srcset — вариант под ширину ленты.
+    src = next(
+        (url for url, width in variants if width >= images.VARIANT_RATIO[0]),
+        variants[-1][0])
+    ratio_width, ratio_height = images.VARIANT_RATIO
+    return {
+        'post': post,
+        'variants': variants,
+        'src': src,
+        'srcset': ', '.join(f'{url} {width}w' for url, width in variants),
+        'sizes': sizes,
+        'width': ratio_width,
+        'height': ratio_height,
+        'lazy': lazy,
+    }
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import urls
+from posts.benchmark import MUTATING_ROUTES
+from posts.models import Follow, Post
+
+
+class BenchmarkCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def test_seeds_and_measures_every_route(self):
+        """Прогон наполняет базу и замеряет адреса posts.urls"""
+        path = os.path.join(self.temp_dir, 'benchmark.json')
+        call_command(
+            'benchmark', '--seed', '--users=20', '--posts=100',
+            '--follows=5', '--groups=2', '--comments=30',
+            '--requests=3', f'--output={path}', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        with open(path) as output:
+            result = json.load(output)
+        routes = result['routes']
+        self.assertEqual(result['skipped'], list(MUTATING_ROUTES))
+        for pattern in urls.urlpatterns:
+            if pattern.name in MUTATING_ROUTES:
+                self.assertNotIn(pattern.name, routes)
+                continue
+            with self.subTest(route=pattern.name):
+                data = routes[pattern.name]
+                self.assertIn(data['status'], (200, 302))
+                self.assertEqual(data['requests'], 3)
+                self.assertLessEqual(data['p50_ms'], data['p99_ms'])
+                self.assertGreater(data['queries_per_request'], 0)
+        follows = set(Follow.objects.values_list('user', 'author'))
+        call_command(
+            'benchmark', '--requests=2', f'--output={path}',
+            stdout=StringIO())
+        self.assertEqual(
+            set(Follow.objects.values_list('user', 'author')), follows)
@@ -1,13 +1,22 @@
+import os
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from http import HTTPStatus
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
 from posts.models import Group, Post, User, Comment
 
 USER = 'user'
@@ -100,7 +109,43 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.author, self.author)
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(
-            post.image.name.split('/')[-1], form_data['image'].name)
+            post.image.name.split('/')[-1],
+            form_data['image'].name.replace('.gif', '.webp'))
+
+    def test_generate_thumbnails_command(self):
+        """Миниатюры создаются только без вариантов, ошибки видны"""
+        Post.objects.filter(pk=self.post.pk).update(image_variants='')
+        broken, cut = (
+            Post.objects.create(author=self.author, text=text)
+            for text in ('Битая', 'Нарезанная'))
+        Post.objects.filter(pk=broken.pk).update(image='posts/missing.gif')
+        Post.objects.filter(pk=cut.pk).update(
+            image='posts/cut.gif', image_variants='q80.webp')
+        out, err = StringIO(), StringIO()
+        with self.assertLogs(
+                'posts.management.commands.generate_thumbnails', 'ERROR'):
+            call_command(
+                'generate_thumbnails', workers=1, stdout=out, stderr=err)
+        self.assertIn('Обработано картинок: 1, с ошибками: 1', out.getvalue())
+        self.assertIn('posts/missing.gif', err.getvalue())
+        self.assertNotIn('posts/cut.gif', err.getvalue())
+        thumbnails = [
+            name
+            for _, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in files
+        ]
+        self.assertTrue(thumbnails)
+
+    def test_thumbnail_metadata_outlives_cache(self):
+        """Сведения о миниатюрах из воркера видны при пустом кэше"""
+        cache = caches[sorl_settings.THUMBNAIL_CACHE]
+        cache.clear()
+        thumbnails.generate(self.post.image.name)
+        cache.clear()
+        source = ImageFile(self.post.image.name, default.storage)
+        self.assertIsNotNone(default.kvstore.get(source))
+        self.assertTrue(list(default.kvstore._find_keys_raw(
+            sorl_settings.THUMBNAIL_KEY_PREFIX)))
 
     def test_post_create_correct_context(self):
         """Шаблоны сформированы с правильным контекстом."""
@@ -145,7 +190,8 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.group_id, form_data['group'])
         self.assertEqual(post.author, self.post.author)
         self.assertEqual(
-            post.image.name.split('/')[-1], form_data['image'].name)
+            post.image.name.split('/')[-1],
+            form_data['image'].name.replace('.gif', '.webp'))
 
     def test_add_comment(self):
         """Тест добавления комментария к посту"""
@@ -163,6 +209,8 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertRedirects(response, self.POST_DETAL)
         self.assertEqual(self.post.comments.count(), comment_count + 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, comment_count + 1)
         self.assertEqual(len(comments), 1)
         comment = comments.pop()
         self.assertEqual(comment.text, form_data['text'])
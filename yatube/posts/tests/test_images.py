@@ -0,0 +1,179 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from core.views import serve_media
+from posts import images
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def photo(size=(300, 100), fmt='JPEG', mode='RGB', orientation=None):
+    """Картинка как с телефона: с EXIF и поворотом в метаданных."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation or 1
+    exif[0x010F] = 'Телефон'
+    output = io.BytesIO()
+    Image.new(mode, size, 'red').save(output, fmt, exif=exif.tobytes())
+    return output.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    IMAGE_MAX_DIMENSION=120,
+    TASKS={'BACKEND': 'core.tasks.backends.ImmediateBackend'})
+class ImagePipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, content, name='photo.jpg'):
+        post = Post.objects.create(
+            author=self.author, text='Фото',
+            image=SimpleUploadedFile(name, content))
+        # Хеш и варианты записала задача после сохранения.
+        post.refresh_from_db()
+        return post
+
+    def variant(self, post, size):
+        return images.variant_name(post.image_hash, size, post.image_variants)
+
+    def test_upload_is_downscaled_rotated_and_stripped(self):
+        """Картинка уменьшена, повёрнута по EXIF и сохранена без него"""
+        post = self.create(photo(orientation=6))
+        self.assertRegex(post.image.name, r'^posts/photo.*\.webp$')
+        self.assertEqual((post.image_width, post.image_height), (40, 120))
+        self.assertEqual(post.image_bytes, post.image.size)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (40, 120))
+            self.assertFalse(image.getexif())
+
+    @override_settings(IMAGE_FORMAT='JPEG')
+    def test_transparent_png_to_progressive_jpeg(self):
+        """Прозрачный PNG становится прогрессивным JPEG на белом фоне"""
+        post = self.create(
+            photo(size=(60, 30), fmt='PNG', mode='RGBA'), 'logo.png')
+        self.assertRegex(post.image.name, r'^posts/logo.*\.jpg$')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertTrue(image.info.get('progressive'))
+            self.assertEqual(image.size, (60, 30))
+
+    def test_clearing_image_resets_metadata(self):
+        post = self.create(photo())
+        post.image = None
+        post.save()
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+        self.assertIsNone(post.image_bytes)
+
+    def test_process_images_command(self):
+        """Старые оригиналы перекодируются, а сами удаляются"""
+        post = self.create(photo())
+        original = default_storage.save(
+            'posts/old.jpg', ContentFile(photo(size=(500, 250))))
+        Post.objects.filter(pk=post.pk).update(
+            image=original, image_width=None, image_height=None,
+            image_bytes=None)
+        out = StringIO()
+        call_command('process_images', stdout=out)
+        self.assertIn('Обработано картинок: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (120, 60))
+        self.assertFalse(default_storage.exists(original))
+
+    @override_settings(IMAGE_MAX_DIMENSION=1000)
+    def test_variants_named_by_content(self):
+        """Варианты не шире картинки, имя выводится из хеша содержимого"""
+        post = self.create(photo(size=(800, 400)))
+        with post.image.open('rb') as file:
+            self.assertEqual(post.image_hash, images.content_hash(file.read()))
+        self.assertEqual(images.variant_sizes(800), [(480, 170), (720, 254)])
+        for size in images.variant_sizes(800):
+            name = self.variant(post, size)
+            self.assertIn(post.image_hash[:20], name)
+            with default_storage.open(name) as file, Image.open(file) as im:
+                self.assertEqual(im.size, size)
+        again = self.create(photo(size=(800, 400)))
+        self.assertEqual(again.image_hash, post.image_hash)
+
+    @override_settings(IMAGE_MAX_DIMENSION=1000)
+    def test_post_image_tag_renders_srcset(self):
+        post = self.create(photo(size=(1000, 500)))
+        html = Template(
+            '{% load post_images %}{% post_image post %}'
+        ).render(Context({'post': post}))
+        url = default_storage.url(self.variant(post, (960, 339)))
+        self.assertIn(f'src="{url}"', html)
+        self.assertIn(f'{url} 960w', html)
+        self.assertIn('sizes="(min-width: 992px) 960px, 100vw"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertNotIn('1440w', html)
+
+    def test_variant_served_as_immutable(self):
+        post = self.create(photo())
+        name = self.variant(post, (480, 170))
+        response = serve_media(
+            RequestFactory().get('/'), name, document_root=TEMP_MEDIA_ROOT)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = serve_media(
+            RequestFactory().get('/'), post.image.name,
+            document_root=TEMP_MEDIA_ROOT)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_process_images_backfills_variants(self):
+        """Команда дописывает хеш и варианты обработанным картинкам"""
+        post = self.create(photo())
+        name = self.variant(post, (480, 170))
+        default_storage.delete(name)
+        Post.objects.filter(pk=post.pk).update(
+            image_hash='', image_variants='')
+        out = StringIO()
+        call_command('process_images', stdout=out)
+        self.assertIn('создано вариантов: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(self.variant(post, (480, 170)), name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_upload_writes_no_variants_before_save(self):
+        """Обработка в запросе вариантов не режет: их режет задача"""
+        post = Post(author=self.author, text='Фото', image=SimpleUploadedFile(
+            'photo.jpg', photo()))
+        images.process(post)
+        self.assertEqual((post.image_hash, post.image_variants), ('', ''))
+        self.assertEqual(images.variants(post), [])
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, 'q80.webp')
+        self.assertTrue(default_storage.exists(
+            self.variant(post, (480, 170))))
+
+    def test_variant_urls_keep_settings_they_were_cut_with(self):
+        """Смена IMAGE_QUALITY не ломает ссылки на нарезанные варианты"""
+        post = self.create(photo())
+        with override_settings(IMAGE_QUALITY=50, IMAGE_FORMAT='JPEG'):
+            for url, width in images.variants(post):
+                with self.subTest(width=width):
+                    self.assertTrue(url.endswith('-q80.webp'))
+                    self.assertTrue(default_storage.exists(
+                        url[len(settings.MEDIA_URL):]))
@@ -1,6 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from .. import caching
+from ..models import Follow, Group, Post, User, UserStats
 
 
 class PostModelTest(TestCase):
@@ -65,3 +70,42 @@ class PostModelTest(TestCase):
     def test_models_have_correct_object_names(self):
         """__str__  task - это строчка с содержимым post.text."""
         self.assertEqual(self.post.text[:15], str(self.post))
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+
+    def assertStats(self, user, posts, following, followers):
+        stats = UserStats.objects.get(user=user)
+        self.assertEqual(
+            (stats.posts_count, stats.following_count, stats.followers_count),
+            (posts, following, followers))
+
+    def test_counters_follow_posts_and_follows(self):
+        """Счётчики меняются вместе с постами и подписками."""
+        post = Post.objects.create(author=self.author, text='Запись')
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertStats(self.author, 1, 0, 1)
+        self.assertStats(self.user, 0, 1, 0)
+        post.delete()
+        follow.delete()
+        self.assertStats(self.author, 0, 0, 0)
+        self.assertStats(self.user, 0, 0, 0)
+
+    def test_rebuild_command(self):
+        """Команда находит и исправляет расхождения."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Запись {i}') for i in range(3))
+        UserStats.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_user_stats', check=True, stdout=StringIO())
+        scope = f'profile:{self.author.username}'
+        before = caching.generation(scope)
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertStats(self.author, 3, 0, 0)
+        self.assertNotEqual(caching.generation(scope), before)
+        call_command('rebuild_user_stats', check=True, stdout=StringIO())
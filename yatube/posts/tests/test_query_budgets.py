@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudget, load_budgets
+from posts import urls
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(TASKS={'BACKEND': 'core.tasks.backends.ImmediateBackend'})
+class QueryBudgetTests(TestCase):
+    """Каждое представление posts укладывается в бюджет на холодном кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for number in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group,
+                text=f'Запись номер {number}')
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_every_posts_view_has_budget(self):
+        budgets = load_budgets()
+        for pattern in urls.urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertIn(f'{urls.app_name}:{pattern.name}', budgets)
+
+    def test_views_within_budget(self):
+        post_url = reverse('posts:post_detail', args=[self.post.pk])
+        with QueryBudget():
+            for url in (
+                reverse('posts:index'),
+                reverse('posts:group_list', args=[self.group.slug]),
+                reverse('posts:profile', args=[self.author.username]),
+                reverse('posts:search') + '?q=запись',
+                post_url,
+                reverse('posts:post_create'),
+                reverse('posts:post_edit', args=[self.post.pk]),
+            ):
+                self.client.get(url)
+            self.client.post(
+                reverse('posts:post_create'), {'text': 'Новая запись'})
+            self.client.post(
+                reverse('posts:post_edit', args=[self.post.pk]),
+                {'text': 'Правка', 'group': self.group.pk})
+            self.client.post(
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': 'Ещё комментарий'})
+            self.client.force_login(self.reader)
+            self.client.get(reverse('posts:follow_index'))
+            self.client.get(reverse(
+                'posts:profile_unfollow', args=[self.author.username]))
+            self.client.get(reverse(
+                'posts:profile_follow', args=[self.author.username]))
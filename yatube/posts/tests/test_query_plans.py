@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+USER = 'reader'
+AUTHOR = 'author'
+SLUG = 'slug'
+FEEDS = {
+    'index': reverse('posts:index'),
+    'group_list': reverse('posts:group_list', args=[SLUG]),
+    'profile': reverse('posts:profile', args=[AUTHOR]),
+    'follow_index': reverse('posts:follow_index'),
+}
+
+
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username=USER)
+        author = User.objects.create_user(username=AUTHOR)
+        group = Group.objects.create(
+            title='Заголовок',
+            slug=SLUG,
+            description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=author)
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=author, group=group)
+            for i in range(30))
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if 'posts_' not in query['sql']:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append((
+                    query['sql'],
+                    [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertIndexedPlans(self, url):
+        for sql, plan in self.feed_plans(url):
+            for step in plan:
+                with self.subTest(sql=sql, step=step):
+                    self.assertFalse(
+                        step.startswith('SCAN') and 'USING' not in step,
+                        'полный скан таблицы')
+                    self.assertNotIn('TEMP B-TREE', step)
+
+    @override_settings(FOLLOW_TIMELINE=True)
+    def test_feeds_use_indexes(self):
+        """Ленты читаются по индексам без полных сканов и сортировок"""
+        for name, url in FEEDS.items():
+            with self.subTest(feed=name):
+                self.assertIndexedPlans(url)
+
+    @override_settings(FOLLOW_TIMELINE=False)
+    def test_follow_join_still_sorts(self):
+        """Без FOLLOW_TIMELINE лента подписок требованию не отвечает.
+
+        Посты всех авторов из подписок собираются соединением с Follow
+        и сортируются во временном B-дереве: индекс (author, pub_date)
+        упорядочивает посты только внутри одного автора. Лента без
+        сортировки — только материализованная (FOLLOW_TIMELINE=True).
+        Если сортировка отсюда пропадёт, перенесите ленту в тест выше.
+        """
+        steps = [
+            step
+            for _, plan in self.feed_plans(FEEDS['follow_index'])
+            for step in plan
+        ]
+        self.assertFalse(any(
+            step.startswith('SCAN') and 'USING' not in step
+            for step in steps))
+        self.assertTrue(any('TEMP B-TREE' in step for step in steps))
@@ -15,6 +15,7 @@ URLS = [
     [f'/posts/{POST_ID}/edit/', 'post_edit', (POST_ID, )],
     [f'/posts/{POST_ID}/', 'post_detail', (POST_ID, )],
     ['/follow/', 'follow_index', ()],
+    ['/search/', 'search', ()],
     [f'/posts/{POST_ID}/comment/', 'add_comment', (POST_ID, )],
     [f'/profile/{USER}/follow/', 'profile_follow', (USER, )],
     [f'/profile/{USER}/unfollow/', 'profile_unfollow', (USER, )]
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import transfer
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class TransferCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for number in range(7):
+            post = Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Запись {number},\nв две строки "с кавычками"')
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def snapshot(self):
+        return {
+            name: list(model.objects.order_by('pk').values_list(
+                *transfer.columns(model)))
+            for name, model in transfer.MODELS.items()
+        }
+
+    def clear(self):
+        for model in reversed(list(transfer.MODELS.values())):
+            model.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют все поля, включая даты"""
+        before = self.snapshot()
+        for fmt in transfer.FORMATS:
+            with self.subTest(format=fmt):
+                directory = os.path.join(self.directory, fmt)
+                call_command(
+                    'export_content', directory, f'--format={fmt}',
+                    '--chunk-size=3', stdout=StringIO())
+                self.clear()
+                call_command(
+                    'import_content', directory, '--chunk-size=3',
+                    stdout=StringIO())
+                self.assertEqual(self.snapshot(), before)
+                self.assertEqual(self.author.stats.posts_count, 7)
+
+    def test_import_invalidates_profiles(self):
+        """После загрузки профили авторов и подписчиков не отдают 304"""
+        call_command('export_content', self.directory, stdout=StringIO())
+        self.clear()
+        etags = {
+            url: self.client.get(url)['ETag']
+            for url in (
+                reverse('posts:profile', args=['author']),
+                reverse('posts:profile', args=['reader']),
+            )
+        }
+        call_command('import_content', self.directory, stdout=StringIO())
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_export_resumes_from_checkpoint(self):
+        """Прерванная выгрузка дописывается без повторов"""
+        original = transfer.encode
+        calls = []
+
+        def failing(rows, names, fmt):
+            calls.append(len(rows))
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return original(rows, names, fmt)
+
+        with mock.patch.object(transfer, 'encode', failing):
+            with self.assertRaises(KeyboardInterrupt):
+                transfer.export(
+                    self.directory, ['posts'], 'ndjson', chunk_size=3,
+                    log=lambda message: None)
+        exported = transfer.export(
+            self.directory, ['posts'], 'ndjson', chunk_size=3, resume=True,
+            log=lambda message: None)
+        self.assertEqual(exported['posts'], 7)
+        with open(os.path.join(self.directory, 'posts.ndjson')) as file:
+            self.assertEqual(len(file.readlines()), 7)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Загрузка после сбоя продолжает с последнего куска"""
+        transfer.export(
+            self.directory, list(transfer.MODELS), 'csv', chunk_size=3,
+            log=lambda message: None)
+        before = self.snapshot()
+        self.clear()
+        original = transfer.Inserter.insert
+        calls = []
+
+        def failing(inserter, records):
+            records = list(records)
+            calls.append((inserter.model, len(records)))
+            if calls == [(Group, 1), (Post, 3), (Post, 3)]:
+                raise ConnectionError
+            return original(inserter, records)
+
+        with mock.patch.object(transfer.Inserter, 'insert', failing):
+            with self.assertRaises(ConnectionError):
+                transfer.load(
+                    self.directory, list(transfer.MODELS), chunk_size=3,
+                    log=lambda message: None)
+        self.assertEqual(Post.objects.count(), 3)
+        calls.clear()
+        with mock.patch.object(transfer.Inserter, 'insert', failing):
+            transfer.load(
+                self.directory, list(transfer.MODELS), chunk_size=3,
+                resume=True, log=lambda message: None)
+        self.assertEqual(calls[:2], [(Post, 3), (Post, 1)])
+        self.assertEqual(self.snapshot(), before)
@@ -1,16 +1,24 @@
 import shutil
+import subprocess
+import sys
 import tempfile
+from unittest import mock
 
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.utils.http import http_date
 
-from posts.models import Post, Group, User, Follow
+from posts import caching, tasks
+from posts.models import (
+    Comment, Follow, Group, Post, SearchPosting, TimelineEntry, User
+)
 from yatube.settings import PAGE_SIZE
 
 INDEX_URL = reverse('posts:index')
+SEARCH_URL = reverse('posts:search')
 FOLLOW_URL = reverse('posts:follow_index')
 SLUG = 'test_slug_post'
 GROUP_SLUG = reverse('posts:group_list', args=[SLUG])
@@ -125,17 +133,49 @@ class TaskPagesTests(TestCase):
                 self.assertNotIn(self.post, response.context[context])
 
     def test_cache_index_page(self):
-        """Проверка работы кэша"""
+        """Кэш ленты живёт до изменения постов"""
+        content = self.authorized_client.get(INDEX_URL).content
+        with self.assertNumQueries(2):
+            cached = self.authorized_client.get(INDEX_URL).content
+        self.assertEqual(content, cached)
         post = Post.objects.create(
             text='Тестовый текст',
             author=self.author)
         content_add = self.authorized_client.get(INDEX_URL).content
+        self.assertNotEqual(content, content_add)
+        self.assertIn(post.text.encode(), content_add)
         post.delete()
         content_delete = self.authorized_client.get(INDEX_URL).content
-        self.assertEqual(content_add, content_delete)
-        cache.clear()
-        content_cache_clear = self.authorized_client.get(INDEX_URL).content
-        self.assertNotEqual(content_add, content_cache_clear)
+        self.assertNotIn(post.text.encode(), content_delete)
+
+    def test_group_edit_invalidates_cache(self):
+        """Правка группы видна на её странице и в ленте сразу"""
+        group = self.post.group
+        for url in (GROUP_SLUG, INDEX_URL, PROFILE_URL):
+            self.authorized_client.get(url)
+        group.title = 'Новое название'
+        group.save()
+        for url in (GROUP_SLUG, INDEX_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), 'Новое название')
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(
+            self.authorized_client.get(GROUP_SLUG).status_code, 404)
+
+    def test_post_fragment_cache(self):
+        """Отрисованный пост переиспользуется лентами до его изменения"""
+        self.authorized_client.get(INDEX_URL)
+        Post.objects.filter(pk=self.post.pk).update(text='Скрытая правка')
+        self.assertNotIn(
+            'Скрытая правка',
+            self.authorized_client.get(PROFILE_URL).content.decode())
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        self.assertIn(
+            'Скрытая правка',
+            self.authorized_client.get(GROUP_SLUG).content.decode())
 
     def test_paginator(self):
         Post.objects.bulk_create(Post(
@@ -161,6 +201,30 @@ class TaskPagesTests(TestCase):
                     self.authorized_client.get(page).context.get(
                         'page_obj').object_list), urls)
 
+    def test_cursor_paginator(self):
+        """Курсорная пагинация листает ленту вперёд и назад"""
+        Post.objects.bulk_create(Post(
+            text=f'Тестовый пост {i}',
+            author=self.author,
+            group=self.group
+        ) for i in range(PAGE_SIZE + 3))
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        first = self.authorized_client.get(INDEX_URL).context['page_obj']
+        self.assertEqual(list(first), expected[:PAGE_SIZE])
+        self.assertIsNone(first.previous_cursor)
+        second = self.authorized_client.get(
+            f'{INDEX_URL}?cursor={first.next_cursor}').context['page_obj']
+        self.assertEqual(list(second), expected[PAGE_SIZE:])
+        self.assertIsNone(second.next_cursor)
+        back = self.authorized_client.get(
+            f'{INDEX_URL}?cursor={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[:PAGE_SIZE])
+        self.assertIsNone(back.previous_cursor)
+        broken = self.authorized_client.get(
+            f'{INDEX_URL}?cursor=broken').context['page_obj']
+        self.assertEqual(list(broken), expected[:PAGE_SIZE])
+
     def test_follow_on_authors(self):
         """Тест - пользователь может подписаться на автора"""
         Follow.objects.all().delete()
@@ -176,3 +240,309 @@ class TaskPagesTests(TestCase):
         self.authorized_client.get(PROFILE_UNFOLLOW)
         self.assertFalse(Follow.objects.filter(
             user=self.author, author=self.follower).exists())
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER)
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            slug=SLUG,
+            description='Описание'
+        )
+        Follow.objects.create(user=cls.author, author=cls.author)
+        Post.objects.bulk_create(Post(
+            text=f'Тестовый пост {i}',
+            author=cls.author,
+            group=cls.group
+        ) for i in range(PAGE_SIZE))
+        cls.post = Post.objects.create(author=cls.author, text='Обсуждение')
+        for i in range(PAGE_SIZE):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}')
+        cls.DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_query_count(self):
+        """Число запросов ленты не зависит от числа постов на странице"""
+        urls = {
+            INDEX_URL: 3,
+            GROUP_SLUG: 4,
+            PROFILE_URL: 4,
+            FOLLOW_URL: 3,
+            self.DETAIL_URL: 5,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.authorized_client.get(url)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=USER)
+        cls.reader = User.objects.create_user(username=USER2)
+        cls.post = Post.objects.create(author=cls.author, text='Запись')
+        cls.DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_post_answers_not_modified(self):
+        """Пост без изменений отдаётся как 304 после одного запроса"""
+        response = self.client.get(self.DETAIL_URL)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        response = self.client.get(self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+        etag = response['ETag']
+        comment.delete()
+        response = self.client.get(self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Комментарий')
+
+    def test_post_etag_depends_on_user(self):
+        etag = self.client.get(self.DETAIL_URL)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_etag_follows_csrf_token(self):
+        """Вход меняет CSRF-токен, и страница со старым не отдаётся"""
+        self.client.force_login(self.reader)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        etag = self.client.get(self.DETAIL_URL)['ETag']
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.client.get(self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_post_is_not_found(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id + 1]),
+            HTTP_IF_NONE_MATCH='"anything"')
+        self.assertEqual(response.status_code, 404)
+
+    def test_feeds_answer_not_modified_without_queries(self):
+        """ETag профиля и группы берётся из поколения кэша"""
+        group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание')
+        for url in (PROFILE_URL, GROUP_SLUG):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response['ETag']
+                self.assertFalse(response.has_header('Last-Modified'))
+                # Дата не знает ни пользователя, ни долей секунды.
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date())
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                Post.objects.create(
+                    author=self.author, group=group, text=f'Новая {url}')
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_unknown_feeds_leave_no_cache_keys(self):
+        """Адреса несуществующих групп и авторов не заводят поколений"""
+        for url in (
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=['missing']),
+            reverse('api:group_list', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        for scope in ('group:missing', 'profile:missing'):
+            with self.subTest(scope=scope):
+                self.assertIsNone(caches[caching.COUNTERS].get(
+                    caching.GENERATION_KEY.format(scope)))
+
+    def test_bump_from_another_process_reaches_feeds(self):
+        """Сдвиг поколения в воркере или команде виден веб-процессу"""
+        etag = self.client.get(PROFILE_URL)['ETag']
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c',
+             f'from posts import caching; caching.bump("profile:{USER}")'],
+            cwd=settings.BASE_DIR, check=True)
+        response = self.client.get(PROFILE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_evicted_generation_does_not_revive_pages(self):
+        self.client.get(PROFILE_URL)
+        Post.objects.create(author=self.author, text='Свежая запись')
+        caches[caching.COUNTERS].delete(
+            caching.GENERATION_KEY.format(f'profile:{USER}'))
+        self.assertContains(self.client.get(PROFILE_URL), 'Свежая запись')
+
+
+@override_settings(
+    FOLLOW_TIMELINE=True,
+    TASKS={'BACKEND': 'core.tasks.backends.ImmediateBackend'})
+class FollowTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER)
+        cls.reader = User.objects.create_user(username=USER2)
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старая запись')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.FOLLOW_AUTHOR = reverse('posts:profile_follow', args=[USER])
+        cls.UNFOLLOW_AUTHOR = reverse('posts:profile_unfollow', args=[USER])
+
+    def feed(self):
+        return list(
+            self.reader_client.get(FOLLOW_URL).context['page_obj'])
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента подписок собирается при подписке, посте и отписке"""
+        self.reader_client.get(self.FOLLOW_AUTHOR)
+        self.assertEqual(self.feed(), [self.old_post])
+        self.author_client.post(
+            reverse('posts:post_create'), data={'text': 'Новая запись'})
+        new_post = Post.objects.get(text='Новая запись')
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        with self.assertNumQueries(4):
+            self.reader_client.get(FOLLOW_URL)
+        self.reader_client.get(self.UNFOLLOW_AUTHOR)
+        self.assertEqual(self.feed(), [])
+
+    def test_timeline_follows_changes_outside_views(self):
+        """Подписки и посты из админки и shell тоже попадают в ленту"""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Из админки')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        follow.delete()
+        self.assertEqual(self.feed(), [])
+
+    def test_backfill_after_unfollow_does_nothing(self):
+        """Заполнение, дождавшееся очереди после отписки, пропускается"""
+        with mock.patch.object(tasks.backfill_timeline, 'delay'):
+            self.reader_client.get(self.FOLLOW_AUTHOR)
+        self.reader_client.get(self.UNFOLLOW_AUTHOR)
+        tasks.backfill_timeline(self.reader.pk, self.author.pk)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_hybrid_timeline_merges_popular_authors(self):
+        """Посты популярных авторов подмешиваются при чтении ленты"""
+        star = User.objects.create_user(username='star')
+        star_client = Client()
+        star_client.force_login(star)
+        Follow.objects.create(user=self.author, author=star)
+        self.reader_client.get(self.FOLLOW_AUTHOR)
+        self.reader_client.get(reverse('posts:profile_follow', args=['star']))
+        for i in range(PAGE_SIZE + 2):
+            client = star_client if i % 2 else self.author_client
+            client.post(
+                reverse('posts:post_create'), data={'text': f'Запись {i}'})
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, author=star).exists())
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        first = self.reader_client.get(FOLLOW_URL).context['page_obj']
+        second = self.reader_client.get(
+            f'{FOLLOW_URL}?cursor={first.next_cursor}').context['page_obj']
+        self.assertEqual(list(first), expected[:PAGE_SIZE])
+        self.assertEqual(list(second), expected[PAGE_SIZE:])
+        self.assertIsNone(second.next_cursor)
+        back = self.reader_client.get(
+            f'{FOLLOW_URL}?cursor={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[:PAGE_SIZE])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_keeps_posts_in_feed(self):
+        """Посты, пропущенные у популярного автора, не пропадают из ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(
+            user=User.objects.create_user(username='other'),
+            author=self.author)
+        post = Post.objects.create(author=self.author, text='Популярная')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        follow.delete()
+        self.assertEqual(self.feed(), [post, self.old_post])
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER)
+        cls.group = Group.objects.create(
+            title='Кошки',
+            slug=SLUG,
+            description='Описание'
+        )
+
+    def search(self, query):
+        return list(self.client.get(
+            SEARCH_URL, {'q': query}).context['page_obj'])
+
+    def check_search(self):
+        in_group = Post.objects.create(
+            author=self.author, text='Рыжий хвост', group=self.group)
+        in_text = Post.objects.create(
+            author=self.author, text='Кошки любят рыжий цвет')
+        Post.objects.create(author=self.author, text='Собака')
+        self.assertEqual(self.search('РЫЖИЙ кошки'), [in_group, in_text])
+        self.assertEqual(self.search('хвост'), [in_group])
+        self.assertEqual(self.search(''), [])
+        in_group.delete()
+        self.assertEqual(self.search('рыжий'), [in_text])
+        fir = Post.objects.create(author=self.author, text='Зелёная ёлка')
+        self.assertEqual(self.search('и ЕЛКА'), [fir])
+
+    def test_fts5_search(self):
+        """Поиск по тексту и группе через FTS5"""
+        self.check_search()
+
+    def test_repeated_search_uses_cache(self):
+        """Повторный поиск не обращается к базе"""
+        Post.objects.create(author=self.author, text='Рыжий хвост')
+        self.search('рыжий')
+        with self.assertNumQueries(0):
+            self.client.get(SEARCH_URL, {'q': 'рыжий'})
+        with self.assertNumQueries(1):
+            self.search('Рыжий')
+
+    def test_postings_search(self):
+        """Поиск по инвертированному индексу без FTS5"""
+        with mock.patch('posts.search.fts5_available', return_value=False):
+            self.check_search()
+
+    def test_long_words_fit_postings(self):
+        """Слово длиннее колонки индекса обрезается и всё равно ищется"""
+        word = 'а' * 100
+        with mock.patch('posts.search.fts5_available', return_value=False):
+            post = Post.objects.create(author=self.author, text=word)
+            self.assertEqual(
+                set(SearchPosting.objects.filter(post=post).values_list(
+                    'term', flat=True)),
+                {'а' * SearchPosting._meta.get_field('term').max_length})
+            self.assertEqual(self.search(word), [post])
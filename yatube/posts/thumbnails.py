@@ -0,0 +1,19 @@
+from sorl.thumbnail import get_thumbnail
+
+# Те же параметры, что у {% thumbnail %} в шаблонах постов.
+THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+def generate(image_name):
+    """Создаёт все миниатюры картинки и запоминает их в kvstore.
+
+    sorl не бросает исключений на битый или пропавший исходник,
+    поэтому отсутствие файла миниатюры считается ошибкой здесь.
+    """
+    for geometry, options in THUMBNAILS:
+        thumbnail = get_thumbnail(image_name, geometry, **options)
+        if not thumbnail.exists():
+            raise OSError(f'Миниатюра {geometry} для {image_name} не создана.')
+    return image_name
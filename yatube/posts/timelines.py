@@ -0,0 +1,151 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Когда включён ``settings.FOLLOW_TIMELINE``, новый пост сразу
+раскладывается по лентам подписчиков, а ``follow_index`` читает
+готовую ленту одним диапазоном по индексу ``(user, pub_date)``.
+
+Посты авторов, у которых подписчиков больше
+``settings.TIMELINE_FANOUT_LIMIT``, по лентам не раскладываются:
+они подмешиваются при чтении слиянием по ``pub_date``. Когда автор
+опускается до лимита, пропущенные посты раскладываются задним числом
+(``backfill_followers``).
+"""
+from django.conf import settings
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import CursorPaginator, MergedCursorPaginator
+
+BATCH_SIZE = 1000
+
+
+def enabled():
+    return getattr(settings, 'FOLLOW_TIMELINE', False)
+
+
+def fanout_limited():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', None) is not None
+
+
+def is_popular(author_id):
+    limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', None)
+    if limit is None:
+        return False
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=limit).exists()
+
+
+def popular_authors(user):
+    """Авторы из подписок, чьи посты читаются при показе ленты."""
+    limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', None)
+    if limit is None:
+        return []
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=limit
+    ).values_list('author_id', flat=True))
+
+
+def _entries(user_ids, post):
+    return (
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date)
+        for user_id in user_ids
+    )
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_insert(_entries(followers.iterator(), post))
+
+
+def backfill(user, author):
+    """Добавляет в ленту посты автора, на которого подписались."""
+    if is_popular(author.pk):
+        return
+    posts = Post.objects.filter(author=author).only(
+        'id', 'author', 'pub_date')
+    _bulk_insert(
+        entry
+        for post in posts.iterator()
+        for entry in _entries([user.pk], post)
+    )
+
+
+def backfill_followers(author_id):
+    """Раскладывает посты автора, опустившегося до лимита, по лентам.
+
+    Пока автор был популярным, ``fan_out`` его посты пропускал; без
+    этого они пропали бы из лент, как только он перестал подмешиваться.
+    Если последний пост уже у всех подписчиков, раскладывать нечего.
+    """
+    if is_popular(author_id):
+        return
+    latest = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('pk', flat=True).first()
+    if latest is None:
+        return
+    followers = list(Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True))
+    if TimelineEntry.objects.filter(
+            post_id=latest).count() >= len(followers):
+        return
+    posts = Post.objects.filter(author_id=author_id).only(
+        'id', 'author', 'pub_date')
+    _bulk_insert(
+        entry
+        for post in posts.iterator()
+        for entry in _entries(followers, post)
+    )
+
+
+def prune(user, author):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def inbox(user):
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group')
+
+
+def paginator(user, per_page):
+    popular = popular_authors(user)
+    if not popular:
+        return CursorPaginator(inbox(user), per_page, key='post_id')
+    return MergedCursorPaginator([(inbox(user), 'post_id')] + [
+        (Post.objects.feed().filter(author_id=author_id), 'id')
+        for author_id in popular
+    ], per_page)
+
+
+def posts_page(page):
+    """Подменяет записи ленты на сами посты, не трогая курсоры."""
+    page.object_list = [
+        obj.post if isinstance(obj, TimelineEntry) else obj
+        for obj in page.object_list
+    ]
+    return page
+
+
+def rebuild(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill(user, follow.author)
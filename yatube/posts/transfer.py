@@ -0,0 +1,282 @@
+"""Потоковые выгрузка и загрузка контента в NDJSON и CSV.
+
+Каждая модель лежит в своём файле ``<имя>.ndjson`` или ``<имя>.csv``
+каталога выгрузки. Выгрузка читает таблицу кусками по возрастанию pk
+(``pk > последний``), загрузка вставляет куски одним ``executemany``,
+каждый в своей транзакции, так что память не растёт с объёмом.
+После каждого куска позиция в файле пишется в контрольную точку
+каталога, с неё продолжает ``resume``. Первичные ключи сохраняются,
+поэтому связи между файлами не рвутся; пользователи должны уже быть
+в базе.
+"""
+import csv
+import io
+import itertools
+import json
+import os
+from datetime import datetime
+
+from django.core.management.color import no_style
+from django.db import (
+    DEFAULT_DB_ALIAS, connection, connections, models, transaction
+)
+
+from .models import Comment, Follow, Group, Post
+
+# Порядок загрузки: сначала то, на что ссылаются остальные.
+MODELS = {
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = 10000
+CHECKPOINT = '{stage}.checkpoint.json'
+
+
+def columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Checkpoint:
+    """Позиции по моделям в JSON-файле; запись атомарна."""
+
+    def __init__(self, directory, stage, resume):
+        self.path = os.path.join(directory, CHECKPOINT.format(stage=stage))
+        self.state = {}
+        if resume and os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as file:
+                self.state = json.load(file)
+
+    def get(self, name):
+        return self.state.get(name, {})
+
+    def save(self, name, **position):
+        self.state[name] = position
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+        os.replace(temporary, self.path)
+
+
+def data_path(directory, name, fmt):
+    return os.path.join(directory, f'{name}.{fmt}')
+
+
+def find_data(directory, name):
+    """Путь и формат файла модели или (None, None)."""
+    for fmt in FORMATS:
+        path = data_path(directory, name, fmt)
+        if os.path.exists(path):
+            return path, fmt
+    return None, None
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode(rows, names, fmt):
+    if fmt == 'ndjson':
+        return ''.join(
+            json.dumps(dict(zip(names, map(_plain, row))),
+                       ensure_ascii=False) + '\n'
+            for row in rows
+        ).encode()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def export(directory, names, fmt, chunk_size=CHUNK_SIZE, resume=False,
+           log=print):
+    """Выгружает модели ``names`` в каталог, возвращает число строк."""
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = Checkpoint(directory, 'export', resume)
+    exported = {}
+    for name in names:
+        model = MODELS[name]
+        state = checkpoint.get(name)
+        if state and state['format'] != fmt:
+            raise ValueError(
+                f'{name}: начатая выгрузка в {state["format"]}, а не {fmt}.')
+        rows = state.get('rows', 0)
+        if not state.get('done'):
+            rows = _export_model(
+                model, data_path(directory, name, fmt), fmt, chunk_size,
+                state, lambda **position: checkpoint.save(
+                    name, format=fmt, **position))
+        exported[name] = rows
+        log(f'{name}: {rows}')
+    return exported
+
+
+def _export_model(model, path, fmt, chunk_size, state, save):
+    fields = columns(model)
+    pk_index = fields.index(model._meta.pk.attname)
+    last, rows = state.get('last_pk'), state.get('rows', 0)
+    queryset = model.objects.order_by('pk').values_list(*fields)
+    with open(path, 'ab' if state else 'wb') as file:
+        if state:
+            # Хвост после контрольной точки мог записаться не целиком.
+            file.truncate(state['offset'])
+        elif fmt == 'csv':
+            file.write(encode([fields], fields, fmt))
+        while True:
+            page = queryset if last is None else queryset.filter(pk__gt=last)
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                break
+            file.write(encode(chunk, fields, fmt))
+            file.flush()
+            last = chunk[-1][pk_index]
+            rows += len(chunk)
+            save(last_pk=last, offset=file.tell(), rows=rows)
+        save(last_pk=last, offset=file.tell(), rows=rows, done=True)
+    return rows
+
+
+def _lines(file, position):
+    """Строки бинарного файла вместе со смещением за их концом."""
+    for raw in file:
+        position += len(raw)
+        yield position, raw.decode('utf-8')
+
+
+def read_rows(file, fmt, offset=0):
+    """Пары (смещение за строкой, словарь полей) начиная с offset."""
+    if fmt == 'ndjson':
+        file.seek(offset)
+        for position, line in _lines(file, offset):
+            if line.strip():
+                yield position, json.loads(line)
+        return
+    header = next(csv.reader([file.readline().decode('utf-8')]))
+    offset = max(offset, file.tell())
+    file.seek(offset)
+    positions = []
+
+    def lines():
+        for position, line in _lines(file, offset):
+            positions.append(position)
+            yield line
+    # csv.reader берёт ровно столько строк, сколько занимает запись,
+    # поэтому последняя прочитанная строка и есть конец записи.
+    for row in csv.reader(lines()):
+        yield positions[-1], dict(zip(header, row))
+        positions.clear()
+
+
+class Inserter:
+    """Вставка строк одним ``executemany`` на кусок.
+
+    ``bulk_create`` на SQLite режет вставку по 999 параметров, а на
+    каждую строку создаёт объект модели и заново компилирует SQL.
+    Здесь один запрос готовится на всю модель, значения готовит
+    ``get_db_prep_save`` каждого поля, как и при ``save()``. Уже
+    существующие pk пропускаются, как с ``ignore_conflicts``.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        # Сам объект соединения, а не прокси: значений миллионы.
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.fields = model._meta.concrete_fields
+        self.attnames = {field.attname for field in self.fields}
+        self.columns = [
+            (field.attname, field.get_default(), self._converter(field))
+            for field in self.fields
+        ]
+        ops = self.connection.ops
+        self.sql = '{} {} ({}) VALUES ({}){}'.format(
+            ops.insert_statement(ignore_conflicts=True),
+            ops.quote_name(model._meta.db_table),
+            ', '.join(ops.quote_name(field.column) for field in self.fields),
+            ', '.join(['%s'] * len(self.fields)),
+            ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        )
+
+    def _converter(self, field):
+        """Функция «значение из файла → значение для базы» для поля."""
+        to_python = field.to_python
+        if isinstance(field, models.DateTimeField):
+            # fromisoformat на порядок быстрее регулярного выражения Django.
+            def to_python(value, parse=field.to_python):
+                try:
+                    return datetime.fromisoformat(value)
+                except (TypeError, ValueError):
+                    return parse(value)
+
+        def convert(value, connection=self.connection):
+            if value is None or (value == '' and field.null):
+                return None
+            return field.get_db_prep_save(to_python(value), connection)
+        return convert
+
+    def prepare(self, record):
+        unknown = set(record) - self.attnames
+        if unknown:
+            raise ValueError(
+                f'{self.model._meta.label}: неизвестные поля '
+                f'{", ".join(sorted(unknown))}.')
+        return [
+            convert(record.get(attname, default))
+            for attname, default, convert in self.columns
+        ]
+
+    def insert(self, records):
+        rows = [self.prepare(record) for record in records]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, rows)
+
+
+def reset_sequences(model):
+    """Счётчик pk после вставки явных ключей (нужно PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def load(directory, names, chunk_size=CHUNK_SIZE, resume=False, log=print):
+    """Загружает модели ``names`` из каталога, возвращает число строк.
+
+    Уже существующие pk пропускаются, поэтому кусок, записанный до
+    сбоя, но не отмеченный в контрольной точке, загрузится повторно
+    без ошибок.
+    """
+    checkpoint = Checkpoint(directory, 'import', resume)
+    loaded = {}
+    for name in names:
+        model = MODELS[name]
+        path, fmt = find_data(directory, name)
+        if path is None:
+            continue
+        state = checkpoint.get(name)
+        rows = state.get('rows', 0)
+        if not state.get('done'):
+            inserter = Inserter(model)
+            with open(path, 'rb') as file:
+                records = read_rows(file, fmt, state.get('offset', 0))
+                for chunk in chunks(records, chunk_size):
+                    with transaction.atomic():
+                        inserter.insert(record for _, record in chunk)
+                    rows += len(chunk)
+                    checkpoint.save(name, offset=chunk[-1][0], rows=rows)
+            checkpoint.save(name, rows=rows, done=True)
+            reset_sequences(model)
+        loaded[name] = rows
+        log(f'{name}: {rows}')
+    return loaded
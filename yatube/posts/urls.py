@@ -13,6 +13,9 @@ urlpatterns = [
     path('profile/<str:username>/',
          views.profile,
          name='profile'),
+    path('search/',
+         views.search,
+         name='search'),
     path('posts/<int:post_id>/',
          views.post_detail,
          name='post_detail'),
@@ -1,49 +1,99 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from core.parallel import gather
 from yatube.settings import PAGE_SIZE
+from . import timelines
+from .caching import cache_feed, feed_etag, post_etag
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
+from .models import Comment, Group, Post, User, Follow, UserStats
+from .paginators import CursorPaginator
+from .search import SearchResults
 
 
 def page_paginator(queryset, request):
-    return Paginator(queryset, PAGE_SIZE).get_page(request.GET.get('page'))
+    if 'page' in request.GET:
+        return Paginator(queryset, PAGE_SIZE).get_page(request.GET['page'])
+    return CursorPaginator(queryset, PAGE_SIZE).get_page(
+        request.GET.get('cursor'))
 
 
-@cache_page(60 * 20)
+def loaded_page(queryset, request):
+    """Страница с уже выполненным запросом, годится для gather."""
+    page = page_paginator(queryset, request)
+    page.object_list = list(page.object_list)
+    return page
+
+
+@cache_feed('index')
 def index(request):
-    page_obj = page_paginator(Post.objects.all(), request)
+    page_obj = page_paginator(Post.objects.feed(), request)
     return render(request, 'posts/index.html', {'page_obj': page_obj})
 
 
+@condition(etag_func=feed_etag('group', 'slug'))
+@cache_feed('group', 'slug')
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group, page_obj = gather(
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda: loaded_page(
+            Post.objects.feed().filter(group__slug=slug), request),
+    )
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': page_paginator(group.posts.all(), request),
+        'page_obj': page_obj,
     })
 
 
+@condition(etag_func=feed_etag('profile', 'username'))
+@cache_feed('profile', 'username')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = (
-        request.user.is_authenticated
-        and request.user != author
-        and Follow.objects.filter(
-            user=request.user,
-            author=author).exists)
+    user = request.user
+    author, following, page_obj = gather(
+        lambda: get_object_or_404(
+            User.objects.select_related('stats'),
+            username=username),
+        lambda: (
+            user.is_authenticated
+            and user.username != username
+            and Follow.objects.filter(
+                user=user,
+                author__username=username).exists()),
+        lambda: loaded_page(
+            Post.objects.feed().filter(author__username=username), request),
+    )
     return render(request, 'posts/profile.html', {
         'author': author,
-        'page_obj': page_paginator(author.posts.all(), request),
+        'stats': UserStats.for_user(author),
+        'page_obj': page_obj,
         'following': following
     })
 
 
+@cache_feed('search')
+def search(request):
+    query = request.GET.get('q', '').strip()
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': Paginator(SearchResults(query), PAGE_SIZE).get_page(
+            request.GET.get('page')),
+    })
+
+
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
+    post, comments = gather(
+        lambda: get_object_or_404(Post.objects.detail(), pk=post_id),
+        lambda: list(
+            Comment.objects.filter(post_id=post_id)
+            .select_related('author').order_by('created', 'id')),
+    )
     return render(request, 'posts/post_detail.html', {
-        'post': get_object_or_404(Post, pk=post_id),
+        'post': post,
+        'comments': comments,
+        'stats': UserStats.for_user(post.author),
         'form': CommentForm(request.POST or None),
     })
 
@@ -100,9 +150,14 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    following = Post.objects.filter(author__following__user=request.user)
-    return render(request, 'posts/follow.html',
-                  {'page_obj': page_paginator(following, request)})
+    if timelines.enabled():
+        page_obj = timelines.posts_page(
+            timelines.paginator(request.user, PAGE_SIZE).get_page(
+                request.GET.get('cursor')))
+    else:
+        page_obj = page_paginator(Post.objects.feed().filter(
+            author__following__user=request.user), request)
+    return render(request, 'posts/follow.html', {'page_obj': page_obj})
 
 
 @login_required
@@ -116,9 +171,10 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
+    follow = get_object_or_404(
         Follow,
         user=request.user,
         author__username=username
-    ).delete()
+    )
+    follow.delete()
     return redirect('posts:follow_index')
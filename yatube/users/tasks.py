@@ -0,0 +1,11 @@
+from django.core.mail import EmailMultiAlternatives
+
+from core.tasks import task
+
+
+@task(max_retries=5, retry_delay=10)
+def send_email(subject, body, from_email, to, html_body=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_body is not None:
+        message.attach_alternative(html_body, 'text/html')
+    message.send()
@@ -9,6 +9,7 @@ from django.contrib.auth.views import PasswordResetCompleteView
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -26,7 +27,7 @@ urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
     path(
         'password_reset/',
-        PasswordResetView.as_view(),
+        PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
         name='password_reset'
     ),
     path(
@@ -0,0 +1,20 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. Django 2.2 handles requests synchronously, so
+core.asgi runs them in a thread pool; serve with any ASGI server, e.g.
+``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIToASGI(
+    get_wsgi_application(),
+    workers=int(os.getenv('ASGI_WORKERS', 0)) or None)
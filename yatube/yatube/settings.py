@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -59,7 +60,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -94,11 +98,63 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# Configured from the environment. DB_ENGINE=postgresql switches to
+# PostgreSQL (needs psycopg2); DB_REPLICAS is a comma-separated list of
+# replica hosts (or SQLite files) that serve reads (see core.routers).
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+# Seconds to keep a connection open between requests; 0 closes it.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('DB_USER', 'yatube'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {'connect_timeout': 5},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {'timeout': 20},
+        }
     }
+
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        **{'HOST' if DB_ENGINE == 'postgresql' else 'NAME': location.strip()},
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# After a write, the same browser reads from the primary for this long
+PRIMARY_STICKY_SECONDS = 5
+
+# Threads for independent queries of one page (see core.parallel);
+# pays off on a networked database, 0 or 1 runs them one by one.
+PARALLEL_QUERIES = int(os.getenv('PARALLEL_QUERIES', 0))
+
+# Applied to every new SQLite connection (see core.db)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are KiB, so this is 64 MiB of page cache
+    'cache_size': -64 * 1024,
 }
 
 
@@ -138,7 +194,16 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'staticfiles')]
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'static'))
+# collectstatic writes content-hashed names plus .gz/.br next to them
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage')
+# Serve STATIC_ROOT from Django itself, for deployments without a CDN;
+# hashed names are cached for a year, the rest for STATIC_MAX_AGE
+SERVE_STATIC = bool(os.getenv('SERVE_STATIC'))
+STATIC_MAX_AGE = 60 * 60
 
 # Login, users, passwords, emails
 LOGIN_URL = 'users:login'
@@ -149,11 +214,71 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Paginator page
 PAGE_SIZE = 10
 
+# Per-view SQL query budgets checked by tests (see core.testing)
+QUERY_BUDGETS_FILE = os.path.join(BASE_DIR, 'query_budgets.json')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Uploaded post images are downscaled and re-encoded without metadata
+IMAGE_MAX_DIMENSION = 2048
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'WEBP')
+IMAGE_QUALITY = 80
+# Content-hashed srcset variants never change and are cached for a year
+IMMUTABLE_MEDIA_PREFIXES = ('posts/variants/',)
+# Thumbnail metadata is stored in sorl's table, shared by web and task
+# workers, and read through its own cache: warm renders run no SQL
+THUMBNAIL_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+THUMBNAIL_CACHE = 'thumbnails'
+
+FEED_CACHE_TIMEOUT = 60 * 20
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Search result id lists; LocMemCache evicts least recently used.
+    'search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'search',
+        'TIMEOUT': 60 * 10,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # Thumbnail metadata in front of sorl's table, kept apart from feeds.
+    'thumbnails': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'thumbnails',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Feed generation counters (posts.caching). Every process that bumps
+    # or reads them - web workers, the task worker, management commands -
+    # must see the same values, so this alias is never per-process.
+    # The file cache is shared on one host; in production point it at
+    # memcached or redis, whose incr is atomic. LocMemCache here only
+    # suits a single-process dev server without a task worker.
+    'generations': {
+        'BACKEND': os.getenv(
+            'GENERATION_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'GENERATION_CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache', 'generations')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Materialized follow feeds (fan-out on write). Without them follow_index
+# joins Follow and sorts the followed authors' posts in a temp B-tree;
+# only the materialized feed reads a page without sorting
+FOLLOW_TIMELINE = False
+# Authors with more followers are merged into follow feeds on read
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Background tasks. For a durable queue use
+# 'core.tasks.backends.SQLiteBackend' with
+# 'OPTIONS': {'path': os.path.join(BASE_DIR, 'tasks.sqlite3')}
+# and run `python manage.py run_task_worker`.
+TASKS = {
+    'BACKEND': 'core.tasks.backends.ThreadPoolBackend',
+    'OPTIONS': {'workers': 4},
 }